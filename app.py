@@ -1,10 +1,12 @@
 import streamlit as st
 import polars as pl
-import calendar
-import plotly.express as px
-import plotly.graph_objects as go
-from great_tables import GT
-import gcsfs
+import json
+
+import cache
+import charts
+import loader
+import queries
+import telemetry
 
 import os
 os.environ["STREAMLIT_SERVER_WEBSOCKET_COMPRESSION"] = "false"
@@ -13,116 +15,231 @@ os.environ["STREAMLIT_SERVER_WEBSOCKET_COMPRESSION"] = "false"
 st.set_page_config(page_title="Cstore Dashboard", layout="wide")
 st.title("Cstore Dashboard - Idaho Stores")
 
-@st.cache_data(show_spinner="Loading data from GCS...")
+timings = telemetry.Timings()
+
+# loader keeps one process-wide copy of the cube and indexes, shared by every
+# session, and swaps in a new one when partitions are appended. It is read
+# on every rerun rather than through cache_resource so sessions pick up the
+# swap. Under serve.py the load has normally finished before the first
+# session arrives.
 def load_data():
+    # Only shows anything while a new snapshot is being built
+    progress_slot = st.empty()
+    shown = {}
+
+    def report_progress(stage, done, total):
+        if stage == "parse":
+            # Shown with the next download update; both share one slot
+            shown["rows"] = done
+            return
+        if stage == "download":
+            step = int(done / total * 20)
+            if shown.get(stage) != step:
+                progress_slot.progress(
+                    done / total,
+                    text=f"Reading {done / 2**20:,.0f} of {total / 2**20:,.0f} MiB, "
+                         f"{shown.get('rows', 0):,} rows parsed",
+                )
+        else:
+            step = done
+            progress_slot.progress(done / total, text=f"Indexing store {done} of {total}")
+        shown[stage] = step
+
     try:
-        fs = gcsfs.GCSFileSystem()  # use ADC on Cloud Run
-        with fs.open("gs://cstore_sample_dashboard_data/cstore_idaho.csv", "rb") as f:
-            df = pl.read_csv(
-                f,
-                try_parse_dates=True,
-                schema_overrides={
-                    "TRANSACTION_ITEM_ID": pl.Utf8,
-                    "TRANSACTION_SET_ID": pl.Utf8,
-                    "STORE_ID": pl.Utf8,
-                    "GTIN": pl.Utf8,
-                }
-            )
-        return df
+        if loader.ready.is_set():
+            loaded = loader.load()
+        else:
+            with st.spinner("Loading data from GCS..."):
+                loaded = loader.load(progress=report_progress)
+        progress_slot.empty()
+        loader.maybe_refresh()
+        return loaded
     except Exception as e:
         st.error("Failed to load data from GCS")
         st.exception(e)
         st.stop()
 
 try:
-    print("Starting to load CSV from GCS...")
-    df = load_data()
-    print("CSV loaded successfully")
+    with timings.stage("load"):
+        cube, indexes, demographics, store_options, date_bounds, spans = load_data()
 except Exception as e:
     st.error(f"Error loading data: {str(e)}")
     st.stop()
 
 
+# One cache for all sessions, so managers viewing the same store and date
+# range reuse each other's tab results until eviction or a new snapshot
+@st.cache_resource
+def get_query_cache():
+    return cache.BoundedCache(
+        max_bytes=int(cache.QUERY_CACHE_MB * 1024 * 1024),
+        ttl=cache.QUERY_CACHE_TTL,
+    )
+
+query_cache = get_query_cache()
+
+
+# Rendered GT HTML and Plotly figure JSON, keyed by the content of the
+# aggregate they were drawn from plus the presentation arguments
+@st.cache_resource
+def get_render_cache():
+    return cache.BoundedCache(max_bytes=int(cache.RENDER_CACHE_MB * 1024 * 1024))
+
+render_cache = get_render_cache()
+
+
 # Sidebar filters
 st.sidebar.header("Filters")
 
-store_options = sorted(df.select("STORE_NAME").unique().to_series().to_list())
-store_choice = st.sidebar.selectbox("Select Store", store_options)
+# Comparison mode runs every metric once over all selected stores, grouped by
+# store, instead of one rerun per store
+compare_mode = st.sidebar.toggle("Compare stores", key="compare_mode")
 
-months = (
-    df.select(pl.col("TRANSACTION_DATE").dt.month().alias("month"))
-    .unique()
-    .sort("month")
-    .to_series()
-    .to_list()
-)
+if compare_mode:
+    selected_stores = st.sidebar.multiselect("Select Stores", store_options, default=store_options)
+    store_choice = None
+else:
+    store_choice = st.sidebar.selectbox("Select Store", store_options)
+    selected_stores = [store_choice]
 
-min_month = min(months)
-max_month = max(months)
-month_range = st.sidebar.slider(
-    "Select Month Range",
-    min_value=min_month,
-    max_value=max_month,
-    value=(min_month, max_month)
+min_date, max_date = date_bounds
+date_range = st.sidebar.date_input(
+    "Select Date Range",
+    value=(min_date, max_date),
+    min_value=min_date,
+    max_value=max_date,
 )
 
-st.sidebar.caption(f"{calendar.month_abbr[month_range[0]]} - {calendar.month_abbr[month_range[1]]}")
+# The picker returns a single date while the second end is being chosen, and
+# nothing once it is cleared; an empty picker means the full range
+if len(date_range) == 2:
+    start_date, end_date = date_range
+elif len(date_range) == 1:
+    start_date = end_date = date_range[0]
+else:
+    start_date, end_date = min_date, max_date
+
+# Tabs 1-3 slice the store's block of the rollup cube by binary search;
+# Demographics looks the store up in the small per-store census table.
+# Cached results are keyed by the partitions the range covers, so an append
+# only invalidates ranges that reach into the new days.
+version = loader.range_version(spans, start_date, end_date)
+timings.context.update(version=version, stores=selected_stores, dates=[start_date, end_date])
+
+with timings.stage("filter"):
+    cube_filtered = queries.slice_stores(cube, indexes["cube"], selected_stores, start_date, end_date)
+
+filter_key = (version, tuple(selected_stores), start_date, end_date)
+
+def lookup(store, key, record, compute):
+    value, hit = store.get_or_compute(key, compute)
+    record["cache"] = "hit" if hit else "miss"
+    return value
+
+def memoized(name, compute):
+    with timings.stage(f"query.{name}") as record:
+        return lookup(query_cache, (name,) + filter_key, record, compute)
+
+def show_gt(name, build, df, *spec):
+    key = (build.__name__, cache.fingerprint(df, *spec))
+    with timings.stage("render.gt", name=name) as record:
+        html = lookup(render_cache, key, record, lambda: build(df, *spec).as_raw_html())
+    st.html(html)
+
+def show_plotly(name, build, df, *spec, **fields):
+    key = (build.__name__, cache.fingerprint(df, *spec))
+    with timings.stage("render.plotly", name=name, **fields) as record:
+        figure_json = lookup(render_cache, key, record, lambda: build(df, *spec).to_json())
+    st.plotly_chart(json.loads(figure_json), width="stretch")
 
-month_choice = list(range(month_range[0], month_range[1] + 1))
+PAGE_SIZES = [25, 50, 100]
 
-df_filtered = df.filter(
-    (pl.col("STORE_NAME") == store_choice) &
-    (pl.col("TRANSACTION_DATE").dt.month().is_in(month_choice))
+def paged_table(name, frame):
+    # Search, sort and paging controls; the filtered and sorted view is cached
+    # per query result, and only the current page is sent to the browser
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    search = search_col.text_input("Search", key=f"{name}_search", placeholder="Search all columns")
+    sort_by = sort_col.selectbox("Sort by", [None, *frame.columns], key=f"{name}_sort")
+    descending = order_col.radio("Order", ["Asc", "Desc"], key=f"{name}_order") == "Desc"
+    page_size = size_col.selectbox("Rows", PAGE_SIZES, key=f"{name}_size")
+
+    key = ("table_view", name, search, sort_by, descending) + filter_key
+    with timings.stage("query.table_view", name=name) as record:
+        view = lookup(query_cache, key, record, lambda: queries.table_view(frame, search, sort_by, descending))
+
+    pages = max(1, -(-view.height // page_size))
+    page_key = f"{name}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+    first = (page - 1) * page_size
+    st.dataframe(view.slice(first, page_size), width="stretch", hide_index=True)
+    st.caption(f"Rows {min(first + 1, view.height):,}-{min(first + page_size, view.height):,} of {view.height:,}")
+
+total_transactions = memoized(
+    "transaction_count", lambda: queries.transaction_count(cube_filtered).collect().item()
 )
+st.sidebar.metric("Total Transactions", f"{total_transactions:,}")
 
-st.sidebar.metric("Total Transactions", f"{df_filtered.height:,}")
+available_demo_cols = [col for col in queries.LOCATION_COLUMNS if col in demographics.columns]
+available_acs = [col for col in queries.ACS_COLUMNS if col in demographics.columns]
 
 # Tabs
-with st.expander("Load dashboard", expanded=True):
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "Top Products (Weekly)",
-        "Beverage Brands",
-        "Cash vs Credit",
-        "Demographics"
-    ])
+TAB_LABELS = [
+    "Top Products (Weekly)",
+    "Beverage Brands",
+    "Cash vs Credit",
+    "Demographics"
+]
+
+def tab_plans():
+    # Every plan reads the same cube_filtered, so the batch shares its scans
+    # and filters
+    if compare_mode:
+        return {"Store Comparison": queries.comparison_plan(cube_filtered)}
+    return {
+        "Top Products (Weekly)": queries.top_products_plan(
+            cube_filtered, cube, indexes, store_choice, start_date, end_date
+        ),
+        "Beverage Brands": queries.beverage_plan(cube_filtered),
+        "Cash vs Credit": queries.payment_plan(
+            cube_filtered, cube, indexes, store_choice, start_date, end_date
+        ),
+        "Demographics": queries.demographics_plan(
+            demographics,
+            store_choice,
+            available_demo_cols,
+            available_acs if len(available_acs) >= 10 else [],
+        ),
+    }
+
+# Every tab's queries run as one batch (shared subplans computed once, the
+# rest concurrently), so switching panels is a cache hit. Unlike st.tabs,
+# only the selected panel is rendered and sent to the browser.
+if compare_mode:
+    active_tab = "Store Comparison"
+else:
+    with st.expander("Load dashboard", expanded=True):
+        active_tab = st.radio(
+            "View", TAB_LABELS, key="active_tab", horizontal=True, label_visibility="collapsed"
+        )
+
+timings.context.update(tab=active_tab)
+tab_results = memoized(
+    "comparison" if compare_mode else "tabs", lambda: queries.collect_plans(tab_plans())
+)
+results = tab_results[active_tab]
 
 
 # Tab 1: Top 5 Products by Week
 
-with tab1:
+if active_tab == "Top Products (Weekly)":
     st.header("Top 5 Products (Excluding Fuels) - Weekly Analysis")
     
     col1, col2 = st.columns(2)
     
-    weekly_products = (
-        df_filtered
-        .filter(
-            (pl.col("CATEGORY") != "Fuel") &
-            (pl.col("ITEM_NAME").is_not_null()) &
-            (pl.col("ITEM_NAME") != "") &
-            (pl.col("ITEM_NAME") != "null")
-        )
-        .with_columns(
-            pl.col("TRANSACTION_DATE").dt.truncate("1w").alias("WEEK")
-        )
-        .group_by(["WEEK", "ITEM_NAME"])
-        .agg(pl.sum("QUANTITY").alias("Total_Sold"))
-        .sort(["WEEK", "Total_Sold"], descending=[False, True])
-    )
-    
-    top_products_overall = (
-        df_filtered
-        .filter(
-            (pl.col("CATEGORY") != "Fuel") &
-            (pl.col("ITEM_NAME").is_not_null()) &
-            (pl.col("ITEM_NAME") != "") &
-            (pl.col("ITEM_NAME") != "null")
-        )
-        .group_by("ITEM_NAME")
-        .agg(pl.sum("QUANTITY").alias("Total_Sold"))
-        .sort("Total_Sold", descending=True)
-        .head(5)
-    )
+    weekly_products = results["weekly_products"]
+    top_products_overall = results["top_products"]
     
     with col1:
         if top_products_overall.height > 0:
@@ -132,52 +249,29 @@ with tab1:
             st.metric("Quantity Sold", f"{top_products_overall[0, 'Total_Sold']:,}")
     
     with st.expander("View Detailed Weekly Breakdown", expanded=False):
-        st.dataframe(weekly_products.to_pandas(), width="stretch")
+        paged_table("weekly_products", weekly_products)
     
     st.subheader("Overall Top 5 Products Summary")
     if top_products_overall.height > 0:
-        gt_table = (
-            GT(top_products_overall.to_pandas())
-            .tab_header(
-                title="Top 5 Products",
-                subtitle="Excluding Fuel Products"
-            )
-            .fmt_number(columns="Total_Sold", decimals=0, use_seps=True)
-            .cols_label(
-                ITEM_NAME="Product Name",
-                Total_Sold="Total Quantity Sold"
-            )
-        )
-        st.html(gt_table.as_raw_html())
+        show_gt("top_products", charts.top_products_table, top_products_overall)
         
-        df_top_pd = top_products_overall.to_pandas()
-        fig = px.bar(df_top_pd, x='ITEM_NAME', y='Total_Sold',
-                    title='Top 5 Products Sold',
-                    labels={'ITEM_NAME': 'Product Name', 'Total_Sold': 'Total Quantity Sold'},
-                    color_discrete_sequence=['#1f77b4'])
-        fig.update_layout(xaxis_tickangle=-45, height=400)
-        st.plotly_chart(fig, width="stretch")
+        show_plotly("top_products", charts.top_products_bar, top_products_overall)
     else:
         st.warning("No products found with current filters")
 
 # Tab 2: Packaged Beverage Brands
 
-with tab2:
+if active_tab == "Beverage Brands":
     st.header("Packaged Beverage Brands Analysis")
     
-    beverages = df_filtered.filter(
-        (pl.col("CATEGORY").str.contains("Beverage")) &
-        (pl.col("BRAND").is_not_null()) &
-        (pl.col("BRAND") != "") &
-        (pl.col("BRAND") != "null")
-    )
+    bev_totals = results["totals"]
     
-    if beverages.height > 0:
+    if bev_totals[0, "Unique_Brands"] > 0:
         with st.container():
             metric_cols = st.columns(3)
-            total_bev_sales = beverages.select(pl.sum("TOTAL_SALE")).item()
-            total_bev_quantity = beverages.select(pl.sum("QUANTITY")).item()
-            unique_brands = beverages.select(pl.n_unique("BRAND")).item()
+            total_bev_sales = bev_totals[0, "Total_Sales"]
+            total_bev_quantity = bev_totals[0, "Total_Quantity"]
+            unique_brands = bev_totals[0, "Unique_Brands"]
             
             with metric_cols[0]:
                 st.metric("Total Beverage Sales", f"${total_bev_sales:,.2f}")
@@ -186,14 +280,7 @@ with tab2:
             with metric_cols[2]:
                 st.metric("Unique Brands", f"{unique_brands}")
         
-        brand_sales = (
-            beverages.group_by("BRAND")
-            .agg([
-                pl.sum("QUANTITY").alias("Total_Quantity"),
-                pl.sum("TOTAL_SALE").alias("Total_Sales")
-            ])
-            .sort("Total_Quantity", descending=True)
-        )
+        brand_sales = results["brand_sales"]
         
         subtab1, subtab2 = st.tabs(["By Quantity", "By Revenue"])
         
@@ -202,126 +289,45 @@ with tab2:
             
             with col_left:
                 st.subheader("Top 10 Brands")
-                gt_brand_qty = (
-                    GT(brand_sales.head(10).to_pandas())
-                    .tab_header(title="Top 10 Beverage Brands by Quantity")
-                    .fmt_number(columns="Total_Quantity", decimals=0, use_seps=True)
-                    .fmt_currency(columns="Total_Sales", currency="USD")
-                    .cols_label(
-                        BRAND="Brand",
-                        Total_Quantity="Quantity Sold",
-                        Total_Sales="Revenue"
-                    )
-                )
-                st.html(gt_brand_qty.as_raw_html())
+                top_brands = brand_sales.head(10)
+                show_gt("top_brands_quantity", charts.brand_table, top_brands, "Top 10 Beverage Brands by Quantity")
                 
-                df_brand_pd = brand_sales.head(10).to_pandas()
-                fig = px.bar(df_brand_pd, x='BRAND', y='Total_Quantity',
-                            title='Top 10 Beverage Brands by Quantity',
-                            labels={'BRAND': 'Brand', 'Total_Quantity': 'Total Quantity Sold'},
-                            color_discrete_sequence=['#ff7f0e'])
-                fig.update_layout(xaxis_tickangle=-45, height=400)
-                st.plotly_chart(fig, width="stretch")
+                show_plotly("top_brands_quantity", charts.brand_bar, top_brands, "Total_Quantity", "Top 10 Beverage Brands by Quantity", "#ff7f0e")
             
             with col_right:
                 st.subheader("Bottom 10 Brands")
                 bottom_brands = brand_sales.tail(10).sort("Total_Quantity", descending=False)
-                gt_brand_bottom = (
-                    GT(bottom_brands.to_pandas())
-                    .tab_header(title="Bottom 10 Beverage Brands by Quantity")
-                    .fmt_number(columns="Total_Quantity", decimals=0, use_seps=True)
-                    .fmt_currency(columns="Total_Sales", currency="USD")
-                    .cols_label(
-                        BRAND="Brand",
-                        Total_Quantity="Quantity Sold",
-                        Total_Sales="Revenue"
-                    )
-                )
-                st.html(gt_brand_bottom.as_raw_html())
+                show_gt("bottom_brands_quantity", charts.brand_table, bottom_brands, "Bottom 10 Beverage Brands by Quantity")
                 
-                df_bottom_pd = bottom_brands.to_pandas()
-                fig = px.bar(df_bottom_pd, x='BRAND', y='Total_Quantity',
-                            title='Bottom 10 Beverage Brands by Quantity',
-                            labels={'BRAND': 'Brand', 'Total_Quantity': 'Total Quantity Sold'},
-                            color_discrete_sequence=['#d62728'])
-                fig.update_layout(xaxis_tickangle=-45, height=400)
-                st.plotly_chart(fig, width="stretch")
+                show_plotly("bottom_brands_quantity", charts.brand_bar, bottom_brands, "Total_Quantity", "Bottom 10 Beverage Brands by Quantity", "#d62728")
         
         with subtab2:
             col_left, col_right = st.columns(2)
+            brand_sales_sorted = brand_sales.sort("Total_Sales", descending=True)
             
             with col_left:
                 st.subheader("Top 10 Brands")
-                brand_sales_sorted = brand_sales.sort("Total_Sales", descending=True)
-                
-                gt_brand_rev = (
-                    GT(brand_sales_sorted.head(10).to_pandas())
-                    .tab_header(title="Top 10 Beverage Brands by Revenue")
-                    .fmt_currency(columns="Total_Sales", currency="USD")
-                    .fmt_number(columns="Total_Quantity", decimals=0, use_seps=True)
-                    .cols_label(
-                        BRAND="Brand",
-                        Total_Quantity="Quantity Sold",
-                        Total_Sales="Revenue"
-                    )
-                )
-                st.html(gt_brand_rev.as_raw_html())
+                top_brands_rev = brand_sales_sorted.head(10)
+                show_gt("top_brands_revenue", charts.brand_table, top_brands_rev, "Top 10 Beverage Brands by Revenue")
                 
-                df_brand_rev_pd = brand_sales_sorted.head(10).to_pandas()
-                fig = px.bar(df_brand_rev_pd, x='BRAND', y='Total_Sales',
-                            title='Top 10 Beverage Brands by Revenue',
-                            labels={'BRAND': 'Brand', 'Total_Sales': 'Total Sales ($)'},
-                            color_discrete_sequence=['#2ca02c'])
-                fig.update_layout(xaxis_tickangle=-45, height=400)
-                st.plotly_chart(fig, width="stretch")
+                show_plotly("top_brands_revenue", charts.brand_bar, top_brands_rev, "Total_Sales", "Top 10 Beverage Brands by Revenue", "#2ca02c")
             
             with col_right:
                 st.subheader("Bottom 10 Brands")
                 bottom_brands_rev = brand_sales_sorted.tail(10).sort("Total_Sales", descending=False)
+                show_gt("bottom_brands_revenue", charts.brand_table, bottom_brands_rev, "Bottom 10 Beverage Brands by Revenue")
                 
-                gt_brand_bottom_rev = (
-                    GT(bottom_brands_rev.to_pandas())
-                    .tab_header(title="Bottom 10 Beverage Brands by Revenue")
-                    .fmt_currency(columns="Total_Sales", currency="USD")
-                    .fmt_number(columns="Total_Quantity", decimals=0, use_seps=True)
-                    .cols_label(
-                        BRAND="Brand",
-                        Total_Quantity="Quantity Sold",
-                        Total_Sales="Revenue"
-                    )
-                )
-                st.html(gt_brand_bottom_rev.as_raw_html())
-                
-                df_bottom_rev_pd = bottom_brands_rev.to_pandas()
-                fig = px.bar(df_bottom_rev_pd, x='BRAND', y='Total_Sales',
-                            title='Bottom 10 Beverage Brands by Revenue',
-                            labels={'BRAND': 'Brand', 'Total_Sales': 'Total Sales ($)'},
-                            color_discrete_sequence=['#d62728'])
-                fig.update_layout(xaxis_tickangle=-45, height=400)
-                st.plotly_chart(fig, width="stretch")
+                show_plotly("bottom_brands_revenue", charts.brand_bar, bottom_brands_rev, "Total_Sales", "Bottom 10 Beverage Brands by Revenue", "#d62728")
     else:
         st.warning("No beverage products found with current filters")
 
 # Tab 3: Cash vs Credit
 
-with tab3:
+if active_tab == "Cash vs Credit":
     st.header("Cash vs Credit Comparison")
     
-    payment_summary = (
-        df_filtered
-        .filter(
-            (pl.col("PAYMENT_TYPE") == "CASH") |
-            (pl.col("PAYMENT_TYPE") == "CREDIT") |
-            (pl.col("PAYMENT_TYPE") == "EBT") |
-            (pl.col("PAYMENT_TYPE") == "DEBIT")
-        )
-        .group_by("PAYMENT_TYPE")
-        .agg([
-            pl.sum("TOTAL_SALE").alias("Total_Sales"),
-            pl.sum("QUANTITY").alias("Total_Items"),
-            pl.len().alias("Transaction_Count")
-        ])
-    )
+    payment_summary = results["payment_summary"]
+    weekly_payment = results["weekly_payment"]
     
     cols = st.columns(len(payment_summary))
     for idx, row in enumerate(payment_summary.iter_rows(named=True)):
@@ -332,110 +338,31 @@ with tab3:
                 f"{row['Total_Items']:,} items"
             )
     
-    gt_payment = (
-        GT(payment_summary.to_pandas())
-        .tab_header(title="Payment Type Summary")
-        .fmt_currency(columns="Total_Sales", currency="USD")
-        .fmt_number(columns=["Total_Items", "Transaction_Count"], decimals=0, use_seps=True)
-        .cols_label(
-            PAYMENT_TYPE="Payment Type",
-            Total_Sales="Total Sales",
-            Total_Items="Total Items",
-            Transaction_Count="# Transactions"
-        )
-    )
-    st.html(gt_payment.as_raw_html())
+    show_gt("payment_summary", charts.payment_summary_table, payment_summary)
     
     with st.expander("View Weekly Payment Trends", expanded=True):
         st.subheader("Sales Target Threshold")
         st.caption("Set a weekly sales target to compare payment type performance against your goal")
         
-        weekly_payment_preview = (
-            df_filtered
-            .filter(
-                (pl.col("PAYMENT_TYPE") == "CASH") |
-                (pl.col("PAYMENT_TYPE") == "CREDIT") |
-                (pl.col("PAYMENT_TYPE") == "EBT") |
-                (pl.col("PAYMENT_TYPE") == "DEBIT")
-            )
-            .with_columns(
-                pl.col("TRANSACTION_DATE").dt.truncate("1w").alias("WEEK")
-            )
-            .group_by(["WEEK", "PAYMENT_TYPE"])
-            .agg(pl.sum("TOTAL_SALE").alias("Total_Sales"))
-        )
-        
-        if weekly_payment_preview.height > 0:
-            min_sales = float(weekly_payment_preview.select(pl.col("Total_Sales").min()).item())
-            max_sales = float(weekly_payment_preview.select(pl.col("Total_Sales").max()).item())
-            avg_sales = float(weekly_payment_preview.select(pl.col("Total_Sales").mean()).item())
+        if weekly_payment.height > 0:
+            weekly_stats = results["weekly_stats"]
             
             target_line = st.slider(
                 "Weekly Sales Target ($)",
-                min_value=int(min_sales),
-                max_value=int(max_sales),
-                value=int(avg_sales),
+                min_value=int(weekly_stats["min"]),
+                max_value=int(weekly_stats["max"]),
+                value=int(weekly_stats["mean"]),
                 step=1000,
                 format="$%d"
             )
         
-        weekly_payment = (
-            df_filtered
-            .filter(
-                (pl.col("PAYMENT_TYPE") == "CASH") |
-                (pl.col("PAYMENT_TYPE") == "CREDIT") |
-                (pl.col("PAYMENT_TYPE") == "EBT") |
-                (pl.col("PAYMENT_TYPE") == "DEBIT")
-            )
-            .with_columns(
-                pl.col("TRANSACTION_DATE").dt.truncate("1w").alias("WEEK")
-            )
-            .group_by(["WEEK", "PAYMENT_TYPE"])
-            .agg(pl.sum("TOTAL_SALE").alias("Total_Sales"))
-            .sort("WEEK")
-        )
-        
-        df_weekly_pd = weekly_payment.to_pandas()
-        df_weekly_pd['WEEK'] = df_weekly_pd['WEEK'].astype(str)
-        
-        fig = px.line(df_weekly_pd, x='WEEK', y='Total_Sales', color='PAYMENT_TYPE',
-                     title='Weekly Sales by Payment Type',
-                     labels={'WEEK': 'Week', 'Total_Sales': 'Total Sales ($)', 'PAYMENT_TYPE': 'Payment Type'},
-                     markers=True)
-        
-        fig.add_hline(y=target_line, line_dash="dash", line_color="red", 
-                     annotation_text=f"Target: ${target_line:,.0f}",
-                     annotation_position="right")
-        
-        fig.update_layout(xaxis_tickangle=-45, height=400)
-        st.plotly_chart(fig, width="stretch")
+        show_plotly("weekly_payment", charts.weekly_payment_line, weekly_payment, target_line)
     
     st.subheader("Most Purchased Items by Payment Type")
     st.caption("Top 10 items for each payment method (excluding fuel)")
     
-    top_items_by_payment = (
-        df_filtered
-        .filter(
-            (pl.col("PAYMENT_TYPE").is_in(["CASH", "CREDIT", "EBT", "DEBIT"])) &
-            (pl.col("CATEGORY") != "Fuel") &
-            (pl.col("ITEM_NAME").is_not_null()) &
-            (pl.col("ITEM_NAME") != "") &
-            (pl.col("ITEM_NAME") != "null")
-        )
-        .group_by(["PAYMENT_TYPE", "ITEM_NAME"])
-        .agg(pl.sum("QUANTITY").alias("Total_Quantity"))
-        .sort(["PAYMENT_TYPE", "Total_Quantity"], descending=[False, True])
-    )
-    
     # Get top 10 items per payment type
-    top_10_per_payment = (
-        top_items_by_payment
-        .with_columns(
-            pl.col("Total_Quantity").rank("dense", descending=True).over("PAYMENT_TYPE").alias("rank")
-        )
-        .filter(pl.col("rank") <= 10)
-        .drop("rank")
-    )
+    top_10_per_payment = results["top_items_by_payment"]
     
     # Create a 2x2 grid for the payment types
     payment_types = top_10_per_payment.select("PAYMENT_TYPE").unique().sort("PAYMENT_TYPE").to_series().to_list()
@@ -454,82 +381,76 @@ with tab3:
                     top_10_per_payment
                     .filter(pl.col("PAYMENT_TYPE") == payment_type)
                     .sort("Total_Quantity", descending=False)
-                    .to_pandas()
                 )
                 
                 with cols[col_idx]:
-                    color_map = {'CASH': '#2ca02c', 'CREDIT': '#1f77b4', 'DEBIT': '#ff7f0e', 'EBT': '#d62728'}
-                    fig = px.bar(payment_data, 
-                                 x='Total_Quantity', 
-                                 y='ITEM_NAME',
-                                 title=f'{payment_type}',
-                                 labels={'ITEM_NAME': 'Product', 'Total_Quantity': 'Quantity'},
-                                 height=400,
-                                 color_discrete_sequence=[color_map.get(payment_type, '#1f77b4')])
-                    fig.update_layout(showlegend=False, margin=dict(l=10, r=10, t=40, b=10))
-                    st.plotly_chart(fig, use_container_width=True)
+                    show_plotly(f"top_items_{payment_type}", charts.payment_items_bar, payment_data, payment_type)
 
 # Tab 4: Census Data
 
-with tab4:
+if active_tab == "Demographics":
     st.header("Store Demographics & Census Data")
     
     with st.container():
         st.subheader("Location Information")
-        demo_cols = ["state_fips", "county_fips", "tract"]
-        available_demo_cols = [col for col in demo_cols if col in df_filtered.columns]
         
         if available_demo_cols:
-            unique_locations = df_filtered.select(available_demo_cols).unique()
-            st.dataframe(unique_locations.to_pandas(), width="stretch")
+            paged_table("locations", results["locations"])
     
     with st.expander("American Community Survey (ACS) Variables", expanded=True):
-        # ACS variables
-        acs_variables = [
-            "median_family_income",
-            "median_income_by_earners",
-            "number_of_earners",
-            "median_income_with_children",
-            "household_type_population",
-            "population",
-            "median_age",
-            "unemployed",
-            "housing_units",
-            "bachelors_degree_count"
-        ]
-        
-        available_acs = [col for col in acs_variables if col in df_filtered.columns]
-        
         if available_acs and len(available_acs) >= 10:
-            acs_data = df_filtered.select(available_acs).unique()
-            
-            acs_pd = acs_data.to_pandas()
-            gt_acs = (
-                GT(acs_pd)
-                .tab_header(
-                    title="Census Demographic Data",
-                    subtitle="American Community Survey Variables"
-                )
-                .fmt_number(
-                    columns=[c for c in available_acs if c in acs_pd.columns],
-                    decimals=0,
-                    use_seps=True
-                )
-                .cols_label(
-                    median_family_income="Median Family Income",
-                    median_income_by_earners="Median Income by Earners",
-                    number_of_earners="Number of Earners",
-                    median_income_with_children="Median Income (with Children)",
-                    household_type_population="Household Type Population",
-                    population="Total Population",
-                    median_age="Median Age",
-                    unemployed="Unemployed Count",
-                    housing_units="Housing Units",
-                    bachelors_degree_count="Bachelor's Degree Count"
-                )
-            )
-            st.html(gt_acs.as_raw_html())
+            show_gt("acs", charts.acs_table, results["acs"])
         else:
             st.warning(f"""
             **{len(available_acs)} ACS variables found**
-            """)
\ No newline at end of file
+            """)
+
+
+# Store Comparison
+
+if active_tab == "Store Comparison":
+    st.header("Store Comparison")
+    
+    store_totals = results["totals"]
+    
+    if store_totals.height > 0:
+        weekly_sales = results["weekly_sales"]
+        weekly_stats = results["weekly_stats"]
+        
+        target_line = st.slider(
+            "Weekly Sales Target per Store ($)",
+            min_value=int(weekly_stats["min"]),
+            max_value=int(weekly_stats["max"]),
+            value=int(weekly_stats["mean"]),
+            step=100,
+            format="$%d",
+            key="compare_target"
+        )
+        
+        ranking = queries.store_ranking(results, target_line)
+        show_gt("store_ranking", charts.store_ranking_table, ranking)
+        
+        show_plotly("weekly_sales_by_store", charts.weekly_sales_multiples, weekly_sales, target_line)
+        
+        col_left, col_right = st.columns(2)
+        with col_left:
+            show_plotly("payment_mix_by_store", charts.payment_mix_bar, results["payment_mix"])
+        with col_right:
+            show_plotly("top_products_by_store", charts.top_products_multiples, results["top_products"])
+    else:
+        st.warning("No sales found for the selected stores and dates")
+
+
+# Performance panel (opt-in) and the per-rerun summary log line
+if st.sidebar.checkbox("Show performance panel", key="perf_panel"):
+    st.sidebar.caption(f"Rerun: {timings.total_ms():,.0f} ms")
+    stage_table = pl.DataFrame(timings.records, infer_schema_length=None)
+    st.sidebar.dataframe(
+        stage_table.select([
+            col for col in ["stage", "name", "cache", "ms", "rss_delta_mb", "peak_rss_mb"]
+            if col in stage_table.columns
+        ]),
+        width="stretch",
+    )
+
+timings.summary()
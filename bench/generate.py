@@ -0,0 +1,104 @@
+import argparse
+import os
+
+import numpy as np
+import polars as pl
+
+import queries
+
+
+CATEGORIES = [
+    "Fuel",
+    "Packaged Beverages",
+    "Cold Dispensed Beverages",
+    "Hot Dispensed Beverages",
+    "Salty Snacks",
+    "Candy",
+    "Tobacco",
+    "Prepared Food",
+    "General Merchandise",
+]
+PAYMENT_TYPES = ["CASH", "CREDIT", "DEBIT", "EBT", "FLEET", "MOBILE"]
+PAYMENT_WEIGHTS = [0.22, 0.38, 0.27, 0.05, 0.05, 0.03]
+CHUNK_ROWS = 1_000_000
+
+
+def _catalog(rng, items, brands):
+    brand_names = np.array([f"Brand {i:03d}" for i in range(brands)])
+    item_brand = brand_names[rng.integers(0, brands, items)]
+    item_category = np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), items)]
+    item_names = np.array([f"{category} Item {i:05d}" for i, category in enumerate(item_category)])
+    item_price = np.round(rng.gamma(2.0, 2.5, items) + 0.5, 2)
+    return item_names, item_brand, item_category, item_price
+
+
+def _stores(rng, stores):
+    tracts = rng.integers(100, 999_999, stores)
+    acs = {
+        column: rng.integers(1_000, 120_000, stores)
+        for column in queries.ACS_COLUMNS
+    }
+    return tracts, acs
+
+
+def generate(path, rows, stores=30, items=5_000, brands=400, days=365, seed=0):
+    # Written in CHUNK_ROWS pieces so 100M-row files never sit in memory
+    rng = np.random.default_rng(seed)
+    item_names, item_brand, item_category, item_price = _catalog(rng, items, brands)
+    tracts, acs = _stores(rng, stores)
+    store_names = np.array([f"Store {i:03d}" for i in range(stores)])
+    start = np.datetime64("2024-01-01T00:00:00", "s").astype(np.int64)
+    # Zipf-like popularity so a handful of items dominate, as in real baskets
+    popularity = 1.0 / np.arange(1, items + 1) ** 1.1
+    popularity /= popularity.sum()
+
+    written = 0
+    with open(path, "wb") as f:
+        while written < rows:
+            n = min(CHUNK_ROWS, rows - written)
+            store = rng.integers(0, stores, n)
+            item = rng.choice(items, n, p=popularity)
+            quantity = rng.integers(1, 4, n)
+            item_name = item_names[item].astype(object)
+            brand = item_brand[item].astype(object)
+            # A sprinkle of the blank/"null" sentinels found in the real extract
+            item_name[rng.random(n) < 0.002] = "null"
+            brand[rng.random(n) < 0.01] = None
+            chunk = pl.DataFrame({
+                "TRANSACTION_ITEM_ID": np.arange(written, written + n).astype(str),
+                "TRANSACTION_SET_ID": (np.arange(written, written + n) // 3).astype(str),
+                "STORE_ID": (store + 1000).astype(str),
+                "STORE_NAME": store_names[store],
+                "TRANSACTION_DATE": pl.Series(
+                    (start + rng.integers(0, days * 86_400, n)) * 1_000
+                ).cast(pl.Datetime("ms")),
+                "GTIN": (item + 10**11).astype(str),
+                "ITEM_NAME": pl.Series(item_name, dtype=pl.Utf8),
+                "BRAND": pl.Series(brand, dtype=pl.Utf8),
+                "CATEGORY": item_category[item],
+                "PAYMENT_TYPE": rng.choice(PAYMENT_TYPES, n, p=PAYMENT_WEIGHTS),
+                "QUANTITY": quantity,
+                "TOTAL_SALE": np.round(item_price[item] * quantity, 2),
+                "state_fips": np.full(n, 16),
+                "county_fips": store % 44 * 2 + 1,
+                "tract": tracts[store],
+                **{column: values[store] for column, values in acs.items()},
+            })
+            chunk.write_csv(f, include_header=written == 0, datetime_format="%Y-%m-%d %H:%M:%S")
+            written += n
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic c-store transactions CSV")
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--stores", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    generate(args.output, args.rows, stores=args.stores, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
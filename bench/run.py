@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import polars as pl
+
+import data
+import queries
+import telemetry
+from bench.generate import generate
+
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "cstore_bench")
+
+
+def _timed(fn, repeat=1):
+    timings = []
+    result = None
+    # peak_rss_mb in the record is then the peak of this stage alone
+    telemetry.reset_peak_rss()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, timings
+
+
+def _record(out, rows, stage, timings, **extra):
+    line = {
+        "benchmark": "cstore_dashboard",
+        "rows": rows,
+        "stage": stage,
+        "seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "repeat": len(timings),
+        "peak_rss_mb": round(telemetry.peak_rss_mb(), 1),
+        "polars": pl.__version__,
+        "threads": pl.thread_pool_size(),
+        "timestamp": time.time(),
+        **extra,
+    }
+    out.write(json.dumps(line) + "\n")
+    out.flush()
+
+
+def tab_benchmarks(cube, indexes, demographics, store, start, end):
+    # The same per-tab bundles app.py renders, minus Streamlit
+    cube_filtered = queries.slice_cube(cube, indexes["cube"], store, start, end)
+    names = demographics.columns
+    location_columns = [column for column in queries.LOCATION_COLUMNS if column in names]
+    acs_columns = [column for column in queries.ACS_COLUMNS if column in names]
+    return {
+        "tab.top_products": lambda: queries.top_products_tab(cube, indexes, store, start, end),
+        "tab.beverages": lambda: queries.beverage_tab(cube_filtered),
+        "tab.payments": lambda: queries.payment_tab(cube, indexes, store, start, end),
+        "tab.demographics": lambda: queries.demographics_tab(
+            demographics, store, location_columns, acs_columns
+        ),
+        # All four as the single batch app.py runs
+        "tab.all": lambda: queries.collect_plans({
+            "top_products": queries.top_products_plan(cube_filtered, cube, indexes, store, start, end),
+            "beverages": queries.beverage_plan(cube_filtered),
+            "payments": queries.payment_plan(cube_filtered, cube, indexes, store, start, end),
+            "demographics": queries.demographics_plan(
+                demographics, store, location_columns, acs_columns
+            ),
+        }),
+    }
+
+
+def run_size(rows, data_dir, repeat, out):
+    csv_path = os.path.join(data_dir, f"cstore_{rows}.csv")
+    if not os.path.exists(csv_path):
+        generate(csv_path, rows)
+    # file:// is read through fs.open() and parsed as it streams in, like
+    # gs:// in production, but from local disk: the snapshot build time
+    # excludes network transfer, and the record says so
+    url = "file://" + os.path.abspath(csv_path)
+    snapshot_dir = tempfile.mkdtemp(prefix="snapshot-", dir=data_dir)
+    try:
+        (lf, tracts, version), timings = _timed(lambda: data.scan_snapshot(url, snapshot_dir))
+        _record(
+            out, rows, "load.snapshot_build", timings,
+            csv_bytes=os.path.getsize(csv_path), source="local", network_transfer="excluded",
+        )
+
+        _, timings = _timed(lambda: data.scan_snapshot(url, snapshot_dir), repeat)
+        _record(out, rows, "load.snapshot_reuse", timings)
+
+        cube, timings = _timed(lambda: queries.build_cube(lf).collect())
+        _record(out, rows, "load.cube", timings, cube_rows=cube.height)
+
+        indexes, timings = _timed(lambda: queries.build_indexes(cube))
+        _record(
+            out, rows, "load.indexes", timings,
+            stores=len(indexes["cube"]),
+            series_rows=indexes["series"].height,
+            topk_rows=indexes["topk"].height,
+            topk_payment_rows=indexes["topk_payment"].height,
+        )
+
+        (stores, (start, end)), timings = _timed(lambda: queries.catalog(cube), repeat)
+        _record(out, rows, "load.catalog", timings)
+
+        _, timings = _timed(
+            lambda: queries.slice_cube(cube, indexes["cube"], stores[0], start, end), repeat
+        )
+        _record(out, rows, "filter.slice", timings, store=stores[0])
+
+        demographics, timings = _timed(lambda: queries.store_demographics(lf, tracts).collect())
+        _record(out, rows, "load.demographics", timings, store_tract_rows=demographics.height)
+
+        benchmarks = tab_benchmarks(cube, indexes, demographics, stores[0], start, end)
+        for stage, compute in benchmarks.items():
+            _, timings = _timed(compute, repeat)
+            _record(out, rows, stage, timings, store=stores[0])
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time snapshot load and every dashboard aggregation on synthetic data. "
+                    "Writes one JSON object per stage."
+    )
+    parser.add_argument("--rows", default="1000000",
+                        help="comma separated dataset sizes, e.g. 1000000,10000000,100000000")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="append results to this file instead of stdout")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.rows.split(",")]
+    os.makedirs(args.data_dir, exist_ok=True)
+    out = open(args.output, "a") if args.output else sys.stdout
+    try:
+        if len(sizes) == 1:
+            run_size(sizes[0], args.data_dir, args.repeat, out)
+            return
+        # One process per size so peak RSS is not carried over between sizes
+        for size in sizes:
+            result = subprocess.run(
+                [sys.executable, "-m", "bench.run", "--rows", str(size),
+                 "--data-dir", args.data_dir, "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True,
+            )
+            out.write(result.stdout)
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
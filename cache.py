@@ -0,0 +1,113 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import polars as pl
+
+
+QUERY_CACHE_MB = float(os.environ.get("CSTORE_QUERY_CACHE_MB", "256"))
+QUERY_CACHE_TTL = float(os.environ.get("CSTORE_QUERY_CACHE_TTL", "3600"))
+RENDER_CACHE_MB = float(os.environ.get("CSTORE_RENDER_CACHE_MB", "64"))
+
+
+def fingerprint(*parts):
+    # Content hash of aggregates plus presentation arguments, so identical
+    # results render once no matter which store or filter produced them
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, pl.DataFrame):
+            buffer = io.BytesIO()
+            # Enum dictionaries would otherwise be hashed along with every frame
+            part.with_columns(pl.col(pl.Enum).cast(pl.String)).write_ipc(buffer)
+            digest.update(buffer.getvalue())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def sizeof(value):
+    if isinstance(value, (pl.DataFrame, pl.Series)):
+        return value.estimated_size()
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    # LRU keyed store with a byte budget and optional TTL, safe to share
+    # between Streamlit sessions (each session runs in its own thread)
+
+    def __init__(self, max_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._get(key, default)
+
+    def put(self, key, value):
+        nbytes = sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            if nbytes > self.max_bytes:
+                return value
+            self._entries[key] = (value, nbytes, time.monotonic())
+            self._size += nbytes
+            while self._size > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+        return value
+
+    def get_or_compute(self, key, compute):
+        # (value, hit): the value is computed and stored on a miss. Sessions
+        # that miss a key another session is already computing wait for its
+        # result instead of computing it again.
+        missing = object()
+        with self._lock:
+            value = self._get(key, missing)
+            if value is not missing:
+                return value, True
+            future = self._pending.get(key)
+            computing = future is None
+            if computing:
+                future = self._pending[key] = Future()
+        if not computing:
+            return future.result(), True
+        try:
+            value = self.put(key, compute())
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            with self._lock:
+                del self._pending[key]
+        return value, False
+
+    def _get(self, key, default):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, nbytes, stored_at = entry
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            self._evict(key)
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def _evict(self, key):
+        value, nbytes, stored_at = self._entries.pop(key)
+        self._size -= nbytes
@@ -0,0 +1,235 @@
+import polars as pl
+
+
+# great_tables and plotly.express both read Polars frames directly (plotly
+# through narwhals), so nothing here converts to pandas. Each builder imports
+# the library it draws with, so neither is loaded until a view needs it.
+
+PAYMENT_COLORS = {'CASH': '#2ca02c', 'CREDIT': '#1f77b4', 'DEBIT': '#ff7f0e', 'EBT': '#d62728'}
+
+ACS_LABELS = {
+    "median_family_income": "Median Family Income",
+    "median_income_by_earners": "Median Income by Earners",
+    "number_of_earners": "Number of Earners",
+    "median_income_with_children": "Median Income (with Children)",
+    "household_type_population": "Household Type Population",
+    "population": "Total Population",
+    "median_age": "Median Age",
+    "unemployed": "Unemployed Count",
+    "housing_units": "Housing Units",
+    "bachelors_degree_count": "Bachelor's Degree Count",
+}
+
+
+# Tab 1: Top Products
+
+def top_products_table(top_products):
+    from great_tables import GT
+
+    return (
+        GT(top_products)
+        .tab_header(
+            title="Top 5 Products",
+            subtitle="Excluding Fuel Products"
+        )
+        .fmt_number(columns="Total_Sold", decimals=0, use_seps=True)
+        .cols_label(
+            ITEM_NAME="Product Name",
+            Total_Sold="Total Quantity Sold"
+        )
+    )
+
+
+def top_products_bar(top_products):
+    import plotly.express as px
+
+    fig = px.bar(top_products, x='ITEM_NAME', y='Total_Sold',
+                 title='Top 5 Products Sold',
+                 labels={'ITEM_NAME': 'Product Name', 'Total_Sold': 'Total Quantity Sold'},
+                 color_discrete_sequence=['#1f77b4'])
+    fig.update_layout(xaxis_tickangle=-45, height=400)
+    return fig
+
+
+# Tab 2: Beverage Brands
+
+def brand_table(brands, title):
+    from great_tables import GT
+
+    return (
+        GT(brands)
+        .tab_header(title=title)
+        .fmt_number(columns="Total_Quantity", decimals=0, use_seps=True)
+        .fmt_currency(columns="Total_Sales", currency="USD")
+        .cols_label(
+            BRAND="Brand",
+            Total_Quantity="Quantity Sold",
+            Total_Sales="Revenue"
+        )
+    )
+
+
+def brand_bar(brands, measure, title, color):
+    import plotly.express as px
+
+    labels = {'BRAND': 'Brand', 'Total_Quantity': 'Total Quantity Sold', 'Total_Sales': 'Total Sales ($)'}
+    fig = px.bar(brands, x='BRAND', y=measure,
+                 title=title,
+                 labels={'BRAND': labels['BRAND'], measure: labels[measure]},
+                 color_discrete_sequence=[color])
+    fig.update_layout(xaxis_tickangle=-45, height=400)
+    return fig
+
+
+# Tab 3: Cash vs Credit
+
+def payment_summary_table(payment_summary):
+    from great_tables import GT
+
+    return (
+        GT(payment_summary)
+        .tab_header(title="Payment Type Summary")
+        .fmt_currency(columns="Total_Sales", currency="USD")
+        .fmt_number(columns=["Total_Items", "Transaction_Count"], decimals=0, use_seps=True)
+        .cols_label(
+            PAYMENT_TYPE="Payment Type",
+            Total_Sales="Total Sales",
+            Total_Items="Total Items",
+            Transaction_Count="# Transactions"
+        )
+    )
+
+
+def weekly_payment_line(weekly_payment, target_line):
+    import plotly.express as px
+
+    fig = px.line(weekly_payment.with_columns(pl.col("WEEK").dt.strftime("%Y-%m-%d")),
+                  x='WEEK', y='Total_Sales', color='PAYMENT_TYPE',
+                  title='Weekly Sales by Payment Type',
+                  labels={'WEEK': 'Week', 'Total_Sales': 'Total Sales ($)', 'PAYMENT_TYPE': 'Payment Type'},
+                  markers=True)
+
+    fig.add_hline(y=target_line, line_dash="dash", line_color="red",
+                  annotation_text=f"Target: ${target_line:,.0f}",
+                  annotation_position="right")
+
+    fig.update_layout(xaxis_tickangle=-45, height=400)
+    return fig
+
+
+def payment_items_bar(payment_data, payment_type):
+    import plotly.express as px
+
+    fig = px.bar(payment_data,
+                 x='Total_Quantity',
+                 y='ITEM_NAME',
+                 title=f'{payment_type}',
+                 labels={'ITEM_NAME': 'Product', 'Total_Quantity': 'Quantity'},
+                 height=400,
+                 color_discrete_sequence=[PAYMENT_COLORS.get(payment_type, '#1f77b4')])
+    fig.update_layout(showlegend=False, margin=dict(l=10, r=10, t=40, b=10))
+    return fig
+
+
+# Store comparison
+
+def _facet_rows(frame, wrap):
+    return max(1, -(-frame.get_column("STORE_NAME").n_unique() // wrap))
+
+
+def _row_spacing(rows):
+    # Plotly rejects spacing that leaves no room for the rows
+    return min(0.04, 0.5 / rows)
+
+
+def _strip_facet_titles(fig):
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+
+
+def store_ranking_table(ranking):
+    from great_tables import GT
+
+    payment_columns = [c for c in PAYMENT_COLORS if c in ranking.columns]
+    return (
+        GT(ranking)
+        .tab_header(
+            title="Store Ranking",
+            subtitle="Ranked by total sales"
+        )
+        .fmt_currency(columns="Total_Sales", currency="USD")
+        .fmt_number(columns=["Transaction_Count", "Weeks_On_Target"], decimals=0, use_seps=True)
+        .fmt_percent(columns=["Top_Brand_Share"] + payment_columns, decimals=1)
+        .cols_label(
+            STORE_NAME="Store",
+            Total_Sales="Total Sales",
+            Transaction_Count="# Transactions",
+            Weeks_On_Target="Weeks on Target",
+            Top_Brand="Top Beverage Brand",
+            Top_Brand_Share="Brand Share"
+        )
+    )
+
+
+def weekly_sales_multiples(weekly_sales, target_line, wrap=4):
+    import plotly.express as px
+
+    rows = _facet_rows(weekly_sales, wrap)
+    fig = px.line(weekly_sales.with_columns(pl.col("WEEK").dt.strftime("%Y-%m-%d")),
+                  x='WEEK', y='Total_Sales', facet_col='STORE_NAME', facet_col_wrap=wrap,
+                  title='Weekly Sales by Store',
+                  labels={'WEEK': 'Week', 'Total_Sales': 'Sales ($)'},
+                  color_discrete_sequence=['#1f77b4'],
+                  facet_row_spacing=_row_spacing(rows))
+    fig.add_hline(y=target_line, line_dash="dash", line_color="red")
+    fig.update_xaxes(showticklabels=False)
+    _strip_facet_titles(fig)
+    fig.update_layout(height=200 * rows + 100)
+    return fig
+
+
+def payment_mix_bar(payment_mix):
+    import plotly.express as px
+
+    fig = px.bar(payment_mix, x='Share', y='STORE_NAME', color='PAYMENT_TYPE',
+                 orientation='h',
+                 title='Payment Mix by Store',
+                 labels={'STORE_NAME': 'Store', 'Share': 'Share of Sales', 'PAYMENT_TYPE': 'Payment Type'},
+                 color_discrete_map=PAYMENT_COLORS)
+    fig.update_layout(xaxis_tickformat='.0%', height=max(400, 24 * payment_mix.get_column("STORE_NAME").n_unique() + 120))
+    return fig
+
+
+def top_products_multiples(top_products, wrap=3):
+    import plotly.express as px
+
+    rows = _facet_rows(top_products, wrap)
+    fig = px.bar(top_products, x='Total_Sold', y='ITEM_NAME', facet_col='STORE_NAME', facet_col_wrap=wrap,
+                 orientation='h',
+                 title='Top 5 Products by Store',
+                 labels={'ITEM_NAME': 'Product', 'Total_Sold': 'Quantity'},
+                 color_discrete_sequence=['#1f77b4'],
+                 facet_row_spacing=_row_spacing(rows))
+    fig.update_yaxes(matches=None, showticklabels=True, autorange="reversed")
+    _strip_facet_titles(fig)
+    fig.update_layout(height=180 * rows + 100)
+    return fig
+
+
+# Tab 4: Demographics
+
+def acs_table(acs_data):
+    from great_tables import GT
+
+    return (
+        GT(acs_data)
+        .tab_header(
+            title="Census Demographic Data",
+            subtitle="American Community Survey Variables"
+        )
+        .fmt_number(
+            columns=[c for c in ACS_LABELS if c in acs_data.columns],
+            decimals=0,
+            use_seps=True
+        )
+        .cols_label(**{c: label for c, label in ACS_LABELS.items() if c in acs_data.columns})
+    )
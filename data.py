@@ -0,0 +1,319 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+
+import fsspec
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from queries import ACS_COLUMNS, LOCATION_COLUMNS
+
+
+DATA_URL = os.environ.get(
+    "CSTORE_DATA_URL", "gs://cstore_sample_dashboard_data/cstore_idaho.csv"
+)
+SNAPSHOT_DIR = os.environ.get(
+    "CSTORE_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "cstore_snapshot")
+)
+
+# Bump when the snapshot layout changes so old files are rebuilt
+SNAPSHOT_FORMAT = 5
+# Small row groups keep store/date statistics selective for predicate pushdown
+ROW_GROUP_SIZE = 64_000
+
+# Ingest works in bounded pieces so multi-GB extracts fit a 2 GiB instance
+# whose local disk is memory: the CSV is parsed as it streams in through
+# sequential fsspec block reads of DOWNLOAD_BLOCK bytes (one ranged request
+# per block, not parallel downloads), PARSE_BLOCK bytes at a time, and is
+# never written out. Parsed rows are buffered per store and spilled to
+# staging files every SPILL_ROWS rows, with at most MAX_OPEN_WRITERS staging
+# files open at once.
+DOWNLOAD_BLOCK = 16 * 1024 * 1024
+PARSE_BLOCK = 8 * 1024 * 1024
+SPILL_ROWS = 500_000
+MAX_OPEN_WRITERS = 128
+
+# Low-cardinality text columns stored as Enums with a dictionary fixed at
+# ingest, so filters on them compare integer codes instead of strings
+ENUM_COLUMNS = ["STORE_NAME", "CATEGORY", "BRAND", "PAYMENT_TYPE", "ITEM_NAME"]
+NULL_SENTINELS = ["", "null"]
+
+# Identifiers stay text and the text columns are never left to inference,
+# which only sees the first block
+COLUMN_TYPES = {
+    "TRANSACTION_ITEM_ID": pa.string(),
+    "TRANSACTION_SET_ID": pa.string(),
+    "STORE_ID": pa.string(),
+    "GTIN": pa.string(),
+    "TRANSACTION_DATE": pa.timestamp("us"),
+    **{column: pa.string() for column in ENUM_COLUMNS},
+}
+
+# Census columns are constant per tract, so they live once per distinct row in
+# a dimension table and fact rows carry only TRACT_KEY
+TRACT_COLUMNS = LOCATION_COLUMNS + ACS_COLUMNS
+TRACT_FILE = "tracts.parquet"
+
+
+def open_source(url=DATA_URL):
+    # gs:// resolves to gcsfs with ADC on Cloud Run; local paths work for development
+    return fsspec.core.url_to_fs(url)
+
+
+def _info_version(info):
+    for key in ("generation", "etag", "ETag", "md5Hash"):
+        if info.get(key):
+            return str(info[key])
+    modified = info.get("mtime") or info.get("updated") or info.get("created")
+    return f"{info.get('size')}-{modified}"
+
+
+def source_version(fs, path):
+    return _info_version(fs.info(path))
+
+
+def list_partitions(fs, path):
+    # A single CSV is one partition; a directory or bucket prefix holds one
+    # CSV per day or month. One listing call returns every version.
+    if not fs.isdir(path):
+        return {path: source_version(fs, path)}
+    found = fs.find(path, detail=True)
+    return {
+        name: _info_version(info)
+        for name, info in sorted(found.items())
+        if name.endswith(".csv")
+    }
+
+
+def snapshot_path(path, version, snapshot_dir=SNAPSHOT_DIR):
+    # A directory holding one date-sorted Parquet file per store, in store
+    # order, plus the tract dimension table. The path hash keeps partitions
+    # with the same file name apart.
+    stem = os.path.splitext(os.path.basename(path))[0]
+    stem = f"{stem}-{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+    digest = hashlib.sha1(f"{path}@{version}#{SNAPSHOT_FORMAT}".encode()).hexdigest()[:16]
+    return os.path.join(snapshot_dir, f"{stem}-{digest}")
+
+
+def _enum_columns(lf):
+    names = lf.collect_schema().names()
+    return [column for column in ENUM_COLUMNS if column in names]
+
+
+def normalize_sentinels(lf):
+    return lf.with_columns(
+        pl.when(pl.col(column).is_in(NULL_SENTINELS))
+        .then(None)
+        .otherwise(pl.col(column))
+        .alias(column)
+        for column in _enum_columns(lf)
+    )
+
+
+def _tract_columns(lf):
+    names = lf.collect_schema().names()
+    return [column for column in TRACT_COLUMNS if column in names]
+
+
+def split_tracts(batch, tracts):
+    # Swap the census columns of a batch for TRACT_KEY, extending the
+    # dimension table with rows not seen in earlier batches
+    columns = _tract_columns(batch.lazy())
+    if not columns:
+        return batch, tracts
+    if tracts is None:
+        tracts = batch.select(columns).clear().with_columns(
+            pl.lit(None, dtype=pl.UInt32).alias("TRACT_KEY")
+        )
+    new = (
+        batch.select(columns)
+        .unique(maintain_order=True)
+        .join(tracts, on=columns, how="anti", nulls_equal=True)
+    )
+    if new.height:
+        tracts = pl.concat([
+            tracts,
+            new.with_row_index("TRACT_KEY", offset=tracts.height).select(tracts.columns),
+        ])
+    batch = batch.join(tracts, on=columns, how="left", nulls_equal=True).drop(columns)
+    return batch, tracts
+
+
+def encode_enums(df, dictionaries):
+    return df.cast({
+        column: pl.Enum(sorted(values)) for column, values in dictionaries.items()
+    })
+
+
+def enum_types(frames):
+    # The Enum types over the union of the frames' dictionaries
+    categories = {}
+    for frame in frames:
+        for column, dtype in frame.schema.items():
+            if isinstance(dtype, pl.Enum):
+                categories.setdefault(column, set()).update(dtype.categories.to_list())
+    return {column: pl.Enum(sorted(values)) for column, values in categories.items()}
+
+
+def unify_enums(frames):
+    # Every partition is encoded with its own dictionaries; recast the frames
+    # to the union of them so they can be concatenated
+    types = enum_types(frames)
+    return [
+        frame.cast({column: dtype for column, dtype in types.items() if column in frame.columns})
+        for frame in frames
+    ]
+
+
+def read_batches(fs, path, progress=None):
+    # Sequential block reads through fsspec feed the parser directly; only the
+    # block being read and the one being parsed are held in memory
+    size = fs.size(path)
+    with fs.open(path, "rb", block_size=DOWNLOAD_BLOCK) as f:
+        reader = pa_csv.open_csv(
+            f,
+            read_options=pa_csv.ReadOptions(block_size=PARSE_BLOCK),
+            convert_options=pa_csv.ConvertOptions(column_types=COLUMN_TYPES),
+        )
+        for record_batch in reader:
+            yield pl.from_arrow(record_batch)
+            if progress:
+                progress("download", min(f.tell(), size), size)
+
+
+def _partition_by_store(fs, path, raw_dir, progress=None):
+    # Parse the CSV in batches and append each store's rows to its own staging
+    # files, collecting the Enum dictionaries on the way
+    files = {}
+    writers = OrderedDict()
+    pending = {}
+    pending_rows = 0
+    dictionaries = {}
+    tracts = None
+    schema = None
+    rows = 0
+
+    def spill():
+        for store, tables in pending.items():
+            table = pa.concat_tables(tables)
+            writer = writers.pop(store, None)
+            if writer is None:
+                if len(writers) >= MAX_OPEN_WRITERS:
+                    writers.popitem(last=False)[1].close()
+                file = os.path.join(raw_dir, f"raw-{sum(map(len, files.values())):05d}.parquet")
+                files.setdefault(store, []).append(file)
+                writer = pq.ParquetWriter(file, table.schema)
+            writers[store] = writer
+            writer.write_table(table)
+        pending.clear()
+
+    try:
+        for batch in read_batches(fs, path, progress):
+            if schema is None:
+                schema = batch.schema
+                dictionaries = {column: set() for column in _enum_columns(batch.lazy())}
+            batch = normalize_sentinels(batch.lazy().cast(schema)).collect()
+            batch, tracts = split_tracts(batch, tracts)
+            for column, values in dictionaries.items():
+                values.update(batch.get_column(column).drop_nulls().unique().to_list())
+            for (store,), part in batch.partition_by("STORE_NAME", as_dict=True).items():
+                pending.setdefault(store, []).append(part.to_arrow())
+            pending_rows += batch.height
+            rows += batch.height
+            if progress:
+                progress("parse", rows, None)
+            if pending_rows >= SPILL_ROWS:
+                spill()
+                pending_rows = 0
+        spill()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return files, dictionaries, tracts
+
+
+def build_snapshot(fs, path, target, progress=None):
+    snapshot_dir = os.path.dirname(target)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    token = uuid.uuid4().hex
+    staging = f"{target}.{token}.part"
+    raw_dir = os.path.join(staging, "raw")
+    os.makedirs(raw_dir)
+    try:
+        files, dictionaries, tracts = _partition_by_store(fs, path, raw_dir, progress)
+        # Only one store's rows are in memory while sorting and encoding
+        stores = sorted(store for store in files if store is not None)
+        if None in files:
+            stores.append(None)
+        for index, store in enumerate(stores):
+            part = encode_enums(pl.read_parquet(files[store]), dictionaries)
+            part.sort("TRANSACTION_DATE").write_parquet(
+                os.path.join(staging, f"part-{index:05d}.parquet"),
+                statistics=True,
+                row_group_size=ROW_GROUP_SIZE,
+            )
+            for file in files[store]:
+                os.remove(file)
+            if progress:
+                progress("encode", index + 1, len(stores))
+        if tracts is not None:
+            tracts.write_parquet(os.path.join(staging, TRACT_FILE))
+        os.rmdir(raw_dir)
+        os.replace(staging, target)
+    finally:
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+    _remove_stale_snapshots(target)
+    return target
+
+
+def _remove_stale_snapshots(current):
+    snapshot_dir = os.path.dirname(current)
+    prefix = os.path.basename(current).rsplit("-", 1)[0] + "-"
+    for name in os.listdir(snapshot_dir):
+        candidate = os.path.join(snapshot_dir, name)
+        # Staging directories of in-flight builds are left alone
+        if not name.startswith(prefix) or name.endswith(".part") or candidate == current:
+            continue
+        if os.path.isdir(candidate):
+            shutil.rmtree(candidate, ignore_errors=True)
+        else:
+            try:
+                os.remove(candidate)
+            except OSError:
+                pass
+
+
+def remove_snapshot(target):
+    shutil.rmtree(target, ignore_errors=True)
+
+
+def ensure_partition(fs, path, version, snapshot_dir=SNAPSHOT_DIR, progress=None):
+    target = snapshot_path(path, version, snapshot_dir)
+    if not os.path.exists(target):
+        build_snapshot(fs, path, target, progress)
+    return target
+
+
+def ensure_snapshot(url=DATA_URL, snapshot_dir=SNAPSHOT_DIR, progress=None):
+    fs, path = open_source(url)
+    version = source_version(fs, path)
+    return ensure_partition(fs, path, version, snapshot_dir, progress), version
+
+
+def scan_target(target):
+    # The fact rows and the tract dimension (None when the extract has no
+    # census columns) of one built snapshot
+    tract_path = os.path.join(target, TRACT_FILE)
+    tracts = pl.scan_parquet(tract_path) if os.path.exists(tract_path) else None
+    return pl.scan_parquet(os.path.join(target, "part-*.parquet")), tracts
+
+
+def scan_snapshot(url=DATA_URL, snapshot_dir=SNAPSHOT_DIR, progress=None):
+    target, version = ensure_snapshot(url, snapshot_dir, progress)
+    return *scan_target(target), version
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+import time
+
+import polars as pl
+
+import data
+import queries
+import telemetry
+
+
+# One process-wide copy of the loaded tables. Every Streamlit session reads it
+# through app.load_data(), and serve.py fills it from a background thread
+# before the first session connects.
+#
+# The source is a set of partitions (one CSV, or one CSV per day or month
+# under a prefix). Each partition keeps its own snapshot, cube and
+# demographics, so a refresh only ingests partitions that are new or changed
+# and then splices their days into the combined cube and its indexes.
+
+# Seconds between checks of the source for new partitions; 0 turns them off
+REFRESH_SECONDS = float(os.environ.get("CSTORE_REFRESH_SECONDS", "300"))
+
+ready = threading.Event()
+_lock = threading.Lock()
+_partitions = {}
+_source = None
+_checked = 0.0
+_loaded = None
+
+
+def _ingest(fs, path, version, snapshot_dir, progress):
+    target = data.ensure_partition(fs, path, version, snapshot_dir, progress)
+    lf, tracts = data.scan_target(target)
+    cube = queries.build_cube(lf).collect()
+    dates = cube.get_column("DATE")
+    return {
+        "version": version,
+        "target": target,
+        "cube": cube,
+        "demographics": queries.store_demographics(lf, tracts).collect(),
+        "span": (dates.min(), dates.max()),
+    }
+
+
+def _refresh(url, snapshot_dir, progress=None):
+    # Caller holds _lock
+    global _loaded, _source, _checked
+    _source = url, snapshot_dir
+    _checked = time.monotonic()
+    fs, path = data.open_source(url)
+    listing = data.list_partitions(fs, path)
+    changed = {
+        name: version for name, version in listing.items()
+        if _partitions.get(name, {}).get("version") != version
+    }
+    removed = [name for name in _partitions if name not in listing]
+    if _loaded is not None and not changed and not removed:
+        return False
+
+    started = time.perf_counter()
+    partitions = dict(_partitions)
+    dropped = [partitions.pop(name)["target"] for name in removed]
+    for name, version in changed.items():
+        partitions[name] = _ingest(fs, name, version, snapshot_dir, progress)
+
+    parts = [partitions[name] for name in sorted(partitions)]
+    types = data.enum_types([part["cube"] for part in parts])
+    # Days covered by a partition before or after the refresh
+    touched = [
+        part["span"] for part in
+        [_partitions[name] for name in [*changed, *removed] if name in _partitions]
+        + [partitions[name] for name in changed]
+        if part["span"][0] is not None
+    ]
+    if _loaded is None or any(_loaded[0].schema[column] != dtype for column, dtype in types.items()):
+        # A new dictionary value changes every Enum column's codes
+        cube = queries.combine_cubes(data.unify_enums([part["cube"] for part in parts]))
+        indexes = queries.build_indexes(cube)
+    elif touched:
+        first = min(span[0] for span in touched)
+        last = max(span[1] for span in touched)
+        fresh = [
+            part["cube"].filter(pl.col("DATE").is_between(first, last)).cast(types)
+            for part in parts
+            if part["span"][0] is not None and part["span"][0] <= last and part["span"][1] >= first
+        ]
+        cube, indexes = queries.update_tables(
+            _loaded[0], _loaded[1],
+            queries.combine_cubes(fresh) if fresh else _loaded[0].clear(), first, last,
+        )
+    else:
+        cube, indexes = _loaded[:2]
+    demographics = queries.combine_demographics(
+        data.unify_enums([part["demographics"] for part in parts])
+    )
+    store_options, date_bounds = queries.catalog(cube)
+    spans = [(*part["span"], part["version"]) for part in parts if part["span"][0] is not None]
+
+    _partitions.clear()
+    _partitions.update(partitions)
+    _loaded = cube, indexes, demographics, store_options, date_bounds, spans
+    ready.set()
+    # Everything read from them is in memory, and on Cloud Run so is the
+    # snapshot directory
+    for target in dropped:
+        data.remove_snapshot(target)
+    telemetry.log(
+        "partitions loaded", stage="ingest",
+        partitions=len(parts), changed=len(changed), removed=len(removed),
+        ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+    return True
+
+
+def load(url=data.DATA_URL, snapshot_dir=data.SNAPSHOT_DIR, progress=None):
+    if _loaded is None:
+        with _lock:
+            if _loaded is None:
+                _refresh(url, snapshot_dir, progress)
+    return _loaded
+
+
+def maybe_refresh():
+    # Called on every rerun; at most one background check per interval, and
+    # sessions keep reading the previous tables until the new ones are swapped in
+    global _checked
+    if REFRESH_SECONDS <= 0 or _source is None:
+        return
+    if time.monotonic() - _checked < REFRESH_SECONDS or not _lock.acquire(blocking=False):
+        return
+    _checked = time.monotonic()
+
+    def run():
+        try:
+            _refresh(*_source)
+        except Exception as e:
+            telemetry.log("refresh failed", severity="ERROR", stage="ingest", error=repr(e))
+        finally:
+            _lock.release()
+
+    threading.Thread(target=run, name="refresh", daemon=True).start()
+
+
+def range_version(spans, start, end):
+    # Versions of the partitions that overlap [start, end]. Query results are
+    # keyed by it, so new days leave cached results for older ranges valid.
+    versions = [
+        f"{first}:{last}:{version}" for first, last, version in spans
+        if first <= end and last >= start
+    ]
+    return hashlib.sha1("|".join(versions).encode()).hexdigest()[:16]
+
+
+def warm():
+    # Data first, then the rendering libraries the first page draws with
+    started = time.perf_counter()
+    try:
+        load()
+    except Exception as e:
+        telemetry.log("warm-up failed", severity="ERROR", stage="warm", error=repr(e))
+        return False
+    import great_tables  # noqa: F401
+    import plotly.express  # noqa: F401
+    telemetry.log("ready", stage="warm", ms=round((time.perf_counter() - started) * 1000, 2))
+    return True
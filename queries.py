@@ -0,0 +1,780 @@
+from datetime import date, datetime, time, timedelta
+
+import polars as pl
+
+
+PAYMENT_TYPES = ["CASH", "CREDIT", "EBT", "DEBIT"]
+
+# Grain of the rollup cube. Days keep any date range exact (including ranges
+# that span years); WEEK is carried along for the weekly views.
+CUBE_KEYS = ["STORE_NAME", "DATE", "WEEK", "ITEM_NAME", "BRAND", "CATEGORY", "PAYMENT_TYPE"]
+
+
+def build_cube(lf):
+    return (
+        lf.group_by(
+            pl.col("STORE_NAME"),
+            pl.col("TRANSACTION_DATE").dt.date().alias("DATE"),
+            pl.col("TRANSACTION_DATE").dt.truncate("1w").alias("WEEK"),
+            pl.col("ITEM_NAME"),
+            pl.col("BRAND"),
+            pl.col("CATEGORY"),
+            pl.col("PAYMENT_TYPE"),
+        )
+        .agg(
+            pl.sum("QUANTITY"),
+            pl.sum("TOTAL_SALE"),
+            pl.len().alias("TRANSACTION_COUNT"),
+        )
+        .sort(["STORE_NAME", "DATE"])
+    )
+
+
+def combine_cubes(cubes):
+    # Partition cubes may share keys (a store and day split across files);
+    # every reader sums over the cube, so duplicates are harmless and only
+    # the store/date order the offset index relies on is restored
+    return pl.concat(cubes).sort(["STORE_NAME", "DATE"])
+
+
+def build_index(frame, keys=("STORE_NAME",)):
+    # Offset table over a frame sorted by keys then DATE: each key's rows form
+    # one contiguous, date-sorted block, so a key plus a date range is a slice
+    keys = list(keys)
+    offsets = (
+        frame.select(keys)
+        .with_row_index("OFFSET")
+        .group_by(keys, maintain_order=True)
+        .agg(pl.first("OFFSET"), pl.len().alias("LEN"))
+        .drop_nulls(keys)
+    )
+    return {
+        (row[0] if len(keys) == 1 else row[:-2]): (row[-2], row[-1])
+        for row in offsets.iter_rows()
+    }
+
+
+def _date_bounds(frame, block, start, end, column="DATE"):
+    offset, length = block
+    dates = frame.get_column(column).slice(offset, length)
+    lower = dates.search_sorted(start, side="left")
+    upper = dates.search_sorted(end, side="right")
+    return offset + lower, offset + max(lower, upper)
+
+
+def catalog(cube):
+    stores = cube.get_column("STORE_NAME").drop_nulls().unique().sort().to_list()
+    dates = cube.get_column("DATE")
+    return stores, (dates.min(), dates.max())
+
+
+def _slice_bounds(cube, index, store, start, end):
+    if store not in index:
+        return 0, 0
+    return _date_bounds(cube, index[store], start, end)
+
+
+def slice_cube(cube, index, store, start, end):
+    # Binary search inside the store's block; DataFrame.slice does not copy
+    lower, upper = _slice_bounds(cube, index, store, start, end)
+    return cube.slice(lower, upper - lower).lazy()
+
+
+def slice_rows(cube, index, store, start, end):
+    # Row count of slice_cube() without running a query
+    lower, upper = _slice_bounds(cube, index, store, start, end)
+    return upper - lower
+
+
+def slice_stores(cube, index, stores, start, end):
+    slices = [slice_cube(cube, index, store, start, end) for store in stores]
+    return pl.concat(slices) if slices else cube.clear().lazy()
+
+
+# The tab aggregations below read the filtered cube, never raw transaction rows
+
+def transaction_count(lf):
+    return lf.select(pl.sum("TRANSACTION_COUNT"))
+
+
+# Enum columns reject literals outside their dictionary, so list filters are
+# narrowed to the values that actually occur in the data
+
+def _is_in(lf, column, values):
+    dtype = lf.collect_schema()[column]
+    if isinstance(dtype, pl.Enum):
+        categories = set(dtype.categories.to_list())
+        values = [value for value in values if value in categories]
+    return pl.col(column).is_in(values)
+
+
+def _contains(lf, column, text):
+    dtype = lf.collect_schema()[column]
+    if isinstance(dtype, pl.Enum):
+        return pl.col(column).is_in([value for value in dtype.categories.to_list() if text in value])
+    return pl.col(column).str.contains(text)
+
+
+# Blank and "null" names are normalized to real nulls when the snapshot is built
+
+def _valid_items(lf):
+    return lf.filter(
+        (pl.col("CATEGORY") != "Fuel") &
+        (pl.col("ITEM_NAME").is_not_null())
+    )
+
+
+def _known_payments(lf):
+    return lf.filter(_is_in(lf, "PAYMENT_TYPE", PAYMENT_TYPES))
+
+
+# Top-K index: for every store (and payment type) and week, the TOPK_DEPTH
+# best-selling items with exact quantities, plus RESIDUAL, the largest
+# quantity left off that week's list. Summed over the weeks of a range this
+# gives each item a lower and an upper bound, like a SpaceSaving summary with
+# its error term, but deterministic and mergeable by plain addition.
+
+TOPK_DEPTH = 50
+# Below this many cube rows an exact group_by over the slice is cheaper than
+# merging the weekly lists
+TOPK_MIN_ROWS = 100_000
+TOPK_PAYMENT_KEYS = ["STORE_NAME", "PAYMENT_TYPE"]
+
+
+def build_topk(lf, keys=("STORE_NAME",), depth=TOPK_DEPTH):
+    keys = list(keys)
+    weekly = (
+        _valid_items(lf)
+        .group_by(keys + ["WEEK", "ITEM_NAME"])
+        .agg(pl.sum("QUANTITY"))
+        .with_columns(
+            pl.col("QUANTITY").rank("ordinal", descending=True).over(keys + ["WEEK"]).alias("RANK")
+        )
+    )
+    residual = (
+        weekly.filter(pl.col("RANK") == depth + 1)
+        .select(keys + ["WEEK", pl.col("QUANTITY").alias("RESIDUAL")])
+    )
+    return (
+        weekly.filter(pl.col("RANK") <= depth)
+        .join(residual, on=keys + ["WEEK"], how="left")
+        .with_columns(pl.col("RESIDUAL").fill_null(0))
+        .drop("RANK")
+        .sort(keys + ["WEEK"])
+    )
+
+
+def _full_weeks(start, end):
+    # Whole weeks inside [start, end] are [first, stop); the days outside
+    # them are aggregated exactly from the cube slice
+    first = start + timedelta(days=-start.weekday() % 7)
+    stop = end + timedelta(days=1)
+    stop -= timedelta(days=stop.weekday())
+    return first, max(first, stop)
+
+
+def _edge_days(cube, index, store, start, end):
+    # The days of [start, end] outside its whole weeks: two short slices at
+    # either end of the store's date-sorted block of the cube
+    first, stop = _full_weeks(start, end)
+    edges = pl.concat([
+        slice_cube(cube, index, store, start, first - timedelta(days=1)),
+        slice_cube(cube, index, store, stop, end),
+    ]) if first < stop else slice_cube(cube, index, store, start, end)
+    return edges, first, stop
+
+
+def _topk_candidates(partial, topk, block, first, stop, n):
+    # Items that can rank in the top n distinct quantities, with exact totals,
+    # or None when the bounds cannot separate them from the rest
+    weeks = topk.clear()
+    if block is not None and first < stop:
+        lower, upper = _date_bounds(
+            topk, block,
+            datetime.combine(first, time.min),
+            datetime.combine(stop - timedelta(days=1), time.min),
+            column="WEEK",
+        )
+        weeks = topk.slice(lower, upper - lower)
+
+    residual = weeks.unique("WEEK").get_column("RESIDUAL").sum()
+    bounds = (
+        weeks.group_by("ITEM_NAME")
+        .agg(pl.sum("QUANTITY").alias("LOWER"), pl.sum("RESIDUAL").alias("LISTED"))
+        .with_columns((pl.col("LOWER") + residual - pl.col("LISTED")).alias("UPPER"))
+        .join(partial.select("ITEM_NAME", "QUANTITY"), on="ITEM_NAME", how="full", coalesce=True)
+        .select(
+            "ITEM_NAME",
+            pl.col("LOWER").fill_null(0) + pl.col("QUANTITY").fill_null(0),
+            pl.col("UPPER").fill_null(residual) + pl.col("QUANTITY").fill_null(0),
+        )
+    )
+    values = bounds.get_column("LOWER").unique().sort(descending=True)
+    if values.len() < n:
+        # Items left off every list could still fill the remaining places
+        return None if residual > 0 else bounds
+    cutoff = values[n - 1]
+    contenders = bounds.filter(pl.col("UPPER") >= cutoff)
+    if residual >= cutoff or (contenders.get_column("LOWER") != contenders.get_column("UPPER")).any():
+        return None
+    return contenders
+
+
+def build_indexes(cube):
+    # Everything derived from the cube at load time, with offset indexes
+    return index_tables(
+        cube,
+        build_payment_series(cube.lazy()).collect(),
+        build_topk(cube.lazy()).collect(),
+        build_topk(cube.lazy(), TOPK_PAYMENT_KEYS).collect(),
+    )
+
+
+def index_tables(cube, series, topk, topk_payment):
+    # The offset indexes are cheap to rebuild from already sorted tables
+    return {
+        "cube": build_index(cube),
+        "series": series,
+        "series_index": build_index(series, SERIES_KEYS),
+        "topk": topk,
+        "topk_index": build_index(topk),
+        "topk_payment": topk_payment,
+        "topk_payment_index": build_index(topk_payment, TOPK_PAYMENT_KEYS),
+    }
+
+
+# A refresh replaces the rows of [first, last] in each sorted table and keeps
+# the rest as zero-copy slices of the previous tables, so only the new rows
+# take memory and only the touched weeks and running sums are recomputed
+
+# A key's block is copied into one chunk once it is split into more than this
+SPLICE_CHUNKS = 8
+
+
+def splice(frame, index, keys, first, last, fresh, column="DATE"):
+    # frame and fresh are sorted by keys then column; returns the frame with
+    # each key's rows in [first, last] replaced by fresh's, and its index.
+    # Rows with a null key are out of every index and are not kept.
+    fresh_index = build_index(fresh, keys)
+    blocks, spliced, offset = [], {}, 0
+    for key in sorted(set(index) | set(fresh_index)):
+        pieces = []
+        if key in index:
+            start, length = index[key]
+            lower, upper = _date_bounds(frame, index[key], first, last, column)
+            pieces += [frame.slice(start, lower - start), frame.slice(upper, start + length - upper)]
+        if key in fresh_index:
+            pieces.insert(1, fresh.slice(*fresh_index[key]))
+        pieces = [piece for piece in pieces if piece.height]
+        if not pieces:
+            continue
+        block = pl.concat(pieces)
+        if block.n_chunks() > SPLICE_CHUNKS:
+            block = block.rechunk()
+        blocks.append(block)
+        spliced[key] = offset, block.height
+        offset += block.height
+    return (pl.concat(blocks) if blocks else frame.clear()), spliced
+
+
+def _cumulative_offsets(series, series_index, first):
+    # Each series' running sums as of the day before first
+    measures = [f"CUM_{measure}" for measure in SERIES_MEASURES]
+    rows = []
+    for key, block in series_index.items():
+        lower, _ = _date_bounds(series, block, first, first)
+        if lower > block[0]:
+            rows.append((*key, *series.select(measures).row(lower - 1)))
+    return pl.DataFrame(
+        rows,
+        schema={column: series.schema[column] for column in SERIES_KEYS + measures},
+        orient="row",
+    )
+
+
+def update_tables(cube, indexes, fresh, first, last):
+    # fresh holds every cube row of [first, last], sorted like the cube
+    cube, cube_index = splice(cube, indexes["cube"], ["STORE_NAME"], first, last, fresh)
+    stores = list(cube_index)
+
+    # Weeks with a touched day are ranked again from the spliced cube
+    monday = first - timedelta(days=first.weekday())
+    sunday = last + timedelta(days=6 - last.weekday())
+    weeks = slice_stores(cube, cube_index, stores, monday, sunday)
+    week_bounds = datetime.combine(monday, time.min), datetime.combine(sunday, time.min)
+    topk, topk_index = splice(
+        indexes["topk"], indexes["topk_index"], ["STORE_NAME"], *week_bounds,
+        build_topk(weeks).collect(), column="WEEK",
+    )
+    topk_payment, topk_payment_index = splice(
+        indexes["topk_payment"], indexes["topk_payment_index"], TOPK_PAYMENT_KEYS, *week_bounds,
+        build_topk(weeks, TOPK_PAYMENT_KEYS).collect(), column="WEEK",
+    )
+
+    # Running sums change from the first touched day on; the days after it
+    # are summed again and continue from the sums of the day before
+    series = indexes["series"]
+    offsets = _cumulative_offsets(series, indexes["series_index"], first)
+    tail = (
+        build_payment_series(slice_stores(cube, cube_index, stores, first, date.max))
+        .join(offsets.lazy(), on=SERIES_KEYS, how="left", suffix="_BEFORE", maintain_order="left")
+        .with_columns(
+            (pl.col(f"CUM_{measure}") + pl.col(f"CUM_{measure}_BEFORE").fill_null(0))
+            .cast(series.schema[f"CUM_{measure}"])
+            for measure in SERIES_MEASURES
+        )
+        .select(series.columns)
+        .collect()
+    )
+    series, series_index = splice(series, indexes["series_index"], SERIES_KEYS, first, date.max, tail)
+    return cube, {
+        "cube": cube_index,
+        "series": series,
+        "series_index": series_index,
+        "topk": topk,
+        "topk_index": topk_index,
+        "topk_payment": topk_payment,
+        "topk_payment_index": topk_payment_index,
+    }
+
+
+# Tab 1: Top Products
+
+def weekly_products(lf):
+    return (
+        _valid_items(lf)
+        .group_by(["WEEK", "ITEM_NAME"])
+        .agg(pl.sum("QUANTITY").alias("Total_Sold"))
+        .sort(["WEEK", "Total_Sold"], descending=[False, True])
+    )
+
+
+def top_products(lf, n=5):
+    return (
+        _valid_items(lf)
+        .group_by("ITEM_NAME")
+        .agg(pl.sum("QUANTITY").alias("Total_Sold"))
+        .sort("Total_Sold", descending=True)
+        .head(n)
+    )
+
+
+def _ranked_top_products(lf, cube, indexes, store, start, end, n):
+    # A lazy plan and the step that turns its result into the top n: the exact
+    # query over lf (the store's slice of the cube) for small slices, otherwise
+    # the edge-day partial merged with the weekly top-K lists
+    if slice_rows(cube, indexes["cube"], store, start, end) < TOPK_MIN_ROWS:
+        return top_products(lf, n), lambda frame: frame
+    edges, first, stop = _edge_days(cube, indexes["cube"], store, start, end)
+
+    def finish(partial):
+        candidates = _topk_candidates(
+            partial, indexes["topk"], indexes["topk_index"].get(store), first, stop, n
+        )
+        if candidates is None:
+            return top_products(lf, n).collect()
+        return (
+            candidates.select("ITEM_NAME", pl.col("LOWER").alias("Total_Sold"))
+            .sort("Total_Sold", descending=True)
+            .head(n)
+        )
+
+    return _valid_items(edges).group_by("ITEM_NAME").agg(pl.sum("QUANTITY")), finish
+
+
+def top_products_plan(lf, cube, indexes, store, start, end):
+    top, finish_top = _ranked_top_products(lf, cube, indexes, store, start, end, 5)
+    frames = {"weekly_products": weekly_products(lf), "top_products": top}
+
+    def finish(results):
+        return {
+            "weekly_products": results["weekly_products"],
+            "top_products": finish_top(results["top_products"]),
+        }
+
+    return frames, finish
+
+
+def top_products_tab(cube, indexes, store, start, end):
+    lf = slice_cube(cube, indexes["cube"], store, start, end)
+    return collect_plan(top_products_plan(lf, cube, indexes, store, start, end))
+
+
+# Tab 2: Beverage Brands
+
+def beverages(lf):
+    return lf.filter(
+        (_contains(lf, "CATEGORY", "Beverage")) &
+        (pl.col("BRAND").is_not_null())
+    )
+
+
+def beverage_totals(lf):
+    return beverages(lf).select(
+        pl.sum("TOTAL_SALE").alias("Total_Sales"),
+        pl.sum("QUANTITY").alias("Total_Quantity"),
+        pl.n_unique("BRAND").alias("Unique_Brands"),
+    )
+
+
+def brand_sales(lf):
+    return (
+        beverages(lf)
+        .group_by("BRAND")
+        .agg([
+            pl.sum("QUANTITY").alias("Total_Quantity"),
+            pl.sum("TOTAL_SALE").alias("Total_Sales")
+        ])
+        .sort("Total_Quantity", descending=True)
+    )
+
+
+def beverage_plan(lf):
+    frames = {"totals": beverage_totals(lf), "brand_sales": brand_sales(lf)}
+    return frames, lambda results: results
+
+
+def beverage_tab(lf):
+    return collect_plan(beverage_plan(lf))
+
+
+# Tab 3: Cash vs Credit
+
+# Daily totals per store and payment type with running sums, sorted so every
+# (store, payment type) pair is one date-sorted block for build_index()
+SERIES_KEYS = ["STORE_NAME", "PAYMENT_TYPE"]
+SERIES_MEASURES = ["TOTAL_SALE", "QUANTITY", "TRANSACTION_COUNT"]
+
+
+def build_payment_series(lf):
+    return (
+        _known_payments(lf)
+        .group_by(SERIES_KEYS + ["DATE", "WEEK"])
+        .agg(pl.col(SERIES_MEASURES).sum())
+        .sort(SERIES_KEYS + ["DATE"])
+        .with_columns(
+            pl.col(measure).cum_sum().over(SERIES_KEYS).alias(f"CUM_{measure}")
+            for measure in SERIES_MEASURES
+        )
+    )
+
+
+def _series_blocks(series_index, store):
+    return [
+        (payment_type, series_index[(store, payment_type)])
+        for payment_type in PAYMENT_TYPES
+        if (store, payment_type) in series_index
+    ]
+
+
+def payment_summary(series, series_index, store, start, end):
+    # Range totals are the difference of two running sums, whatever the range
+    rows = []
+    for payment_type, block in _series_blocks(series_index, store):
+        lower, upper = _date_bounds(series, block, start, end)
+        if lower == upper:
+            continue
+        last = series.row(upper - 1, named=True)
+        before = series.row(lower - 1, named=True) if lower > block[0] else None
+        rows.append((payment_type, *(
+            last[f"CUM_{measure}"] - (before[f"CUM_{measure}"] if before else 0)
+            for measure in SERIES_MEASURES
+        )))
+    return pl.DataFrame(
+        rows,
+        schema={
+            "PAYMENT_TYPE": pl.String,
+            "Total_Sales": pl.Float64,
+            "Total_Items": pl.Int64,
+            "Transaction_Count": pl.Int64,
+        },
+        orient="row",
+    )
+
+
+def weekly_payment(series, series_index, store, start, end):
+    slices = []
+    for payment_type, block in _series_blocks(series_index, store):
+        lower, upper = _date_bounds(series, block, start, end)
+        slices.append(series.slice(lower, upper - lower))
+    frame = pl.concat(slices) if slices else series.clear()
+    return (
+        frame.lazy()
+        .group_by(["WEEK", "PAYMENT_TYPE"])
+        .agg(pl.sum("TOTAL_SALE").alias("Total_Sales"))
+        .sort("WEEK")
+    )
+
+
+def top_items_by_payment(lf, n=10):
+    return (
+        _known_payments(_valid_items(lf))
+        .group_by(["PAYMENT_TYPE", "ITEM_NAME"])
+        .agg(pl.sum("QUANTITY").alias("Total_Quantity"))
+        .with_columns(
+            pl.col("Total_Quantity").rank("dense", descending=True).over("PAYMENT_TYPE").alias("rank")
+        )
+        .filter(pl.col("rank") <= n)
+        .drop("rank")
+        .sort(["PAYMENT_TYPE", "Total_Quantity"], descending=[False, True])
+    )
+
+
+def weekly_stats(weekly):
+    # Bounds and default for the weekly sales target slider
+    return weekly.select(
+        pl.col("Total_Sales").min().alias("min"),
+        pl.col("Total_Sales").max().alias("max"),
+        pl.col("Total_Sales").mean().alias("mean"),
+    ).row(0, named=True)
+
+
+def _ranked_top_items_by_payment(lf, cube, indexes, store, start, end, n):
+    # Same split as _ranked_top_products; payment types the lists cannot
+    # decide get one exact pass between them
+    if slice_rows(cube, indexes["cube"], store, start, end) < TOPK_MIN_ROWS:
+        return top_items_by_payment(lf, n).with_columns(pl.col("PAYMENT_TYPE").cast(pl.String)), lambda frame: frame
+    edges, first, stop = _edge_days(cube, indexes["cube"], store, start, end)
+
+    def finish(partial):
+        frames = []
+        fallback = []
+        for payment_type in PAYMENT_TYPES:
+            candidates = _topk_candidates(
+                partial.filter(pl.col("PAYMENT_TYPE") == payment_type),
+                indexes["topk_payment"],
+                indexes["topk_payment_index"].get((store, payment_type)),
+                first, stop, n,
+            )
+            if candidates is None:
+                fallback.append(payment_type)
+                continue
+            frames.append(candidates.select(
+                pl.lit(payment_type).alias("PAYMENT_TYPE"),
+                "ITEM_NAME",
+                pl.col("LOWER").alias("Total_Quantity"),
+            ))
+        if fallback:
+            exact = top_items_by_payment(lf.filter(_is_in(lf, "PAYMENT_TYPE", fallback)), n)
+            frames.append(exact.with_columns(pl.col("PAYMENT_TYPE").cast(pl.String)).collect())
+        return pl.concat(frames).sort(["PAYMENT_TYPE", "Total_Quantity"], descending=[False, True])
+
+    partial = (
+        _known_payments(_valid_items(edges))
+        .group_by(["PAYMENT_TYPE", "ITEM_NAME"])
+        .agg(pl.sum("QUANTITY"))
+        .with_columns(pl.col("PAYMENT_TYPE").cast(pl.String))
+    )
+    return partial, finish
+
+
+def payment_plan(lf, cube, indexes, store, start, end):
+    series, series_index = indexes["series"], indexes["series_index"]
+    top_items, finish_top_items = _ranked_top_items_by_payment(lf, cube, indexes, store, start, end, 10)
+    frames = {
+        "weekly_payment": weekly_payment(series, series_index, store, start, end),
+        "top_items_by_payment": top_items,
+    }
+
+    def finish(results):
+        return {
+            "payment_summary": payment_summary(series, series_index, store, start, end),
+            "weekly_payment": results["weekly_payment"],
+            "weekly_stats": weekly_stats(results["weekly_payment"]),
+            "top_items_by_payment": finish_top_items(results["top_items_by_payment"]),
+        }
+
+    return frames, finish
+
+
+def payment_tab(cube, indexes, store, start, end):
+    lf = slice_cube(cube, indexes["cube"], store, start, end)
+    return collect_plan(payment_plan(lf, cube, indexes, store, start, end))
+
+
+# Store comparison: every metric is a single group_by keyed by STORE_NAME over
+# the selected stores, and the whole bundle is collected together
+
+def store_totals(lf):
+    return (
+        lf.group_by("STORE_NAME")
+        .agg([
+            pl.sum("TOTAL_SALE").alias("Total_Sales"),
+            pl.sum("QUANTITY").alias("Total_Items"),
+            pl.sum("TRANSACTION_COUNT").alias("Transaction_Count")
+        ])
+        .sort("Total_Sales", descending=True)
+    )
+
+
+def store_top_products(lf, n=5):
+    return (
+        _valid_items(lf)
+        .group_by(["STORE_NAME", "ITEM_NAME"])
+        .agg(pl.sum("QUANTITY").alias("Total_Sold"))
+        .filter(pl.col("Total_Sold").rank("ordinal", descending=True).over("STORE_NAME") <= n)
+        .sort(["STORE_NAME", "Total_Sold"], descending=[False, True])
+    )
+
+
+def _shares(lf, column):
+    return (
+        lf.group_by(["STORE_NAME", column])
+        .agg(pl.sum("TOTAL_SALE").alias("Total_Sales"))
+        .with_columns(
+            (pl.col("Total_Sales") / pl.col("Total_Sales").sum().over("STORE_NAME")).alias("Share")
+        )
+        .sort(["STORE_NAME", "Total_Sales"], descending=[False, True])
+    )
+
+
+def store_brand_share(lf):
+    return _shares(beverages(lf), "BRAND")
+
+
+def store_payment_mix(lf):
+    return _shares(_known_payments(lf), "PAYMENT_TYPE")
+
+
+def store_weekly_sales(lf):
+    return (
+        lf.group_by(["STORE_NAME", "WEEK"])
+        .agg(pl.sum("TOTAL_SALE").alias("Total_Sales"))
+        .sort(["STORE_NAME", "WEEK"])
+    )
+
+
+def comparison_plan(lf):
+    frames = {
+        "totals": store_totals(lf),
+        "top_products": store_top_products(lf),
+        "brand_share": store_brand_share(lf),
+        "payment_mix": store_payment_mix(lf),
+        "weekly_sales": store_weekly_sales(lf),
+    }
+
+    def finish(results):
+        return {**results, "weekly_stats": weekly_stats(results["weekly_sales"])}
+
+    return frames, finish
+
+
+def store_ranking(results, target_line):
+    # One row per store for the ranked table; only weeks on target depends on
+    # the slider, and that is a pass over the small weekly frame
+    top_brand = (
+        results["brand_share"]
+        .group_by("STORE_NAME", maintain_order=True)
+        .first()
+        .select("STORE_NAME", pl.col("BRAND").alias("Top_Brand"), pl.col("Share").alias("Top_Brand_Share"))
+    )
+    payment_mix = (
+        results["payment_mix"]
+        .with_columns(pl.col("PAYMENT_TYPE").cast(pl.String))
+        .pivot(on="PAYMENT_TYPE", index="STORE_NAME", values="Share")
+    )
+    on_target = (
+        results["weekly_sales"]
+        .group_by("STORE_NAME")
+        .agg((pl.col("Total_Sales") >= target_line).sum().alias("Weeks_On_Target"))
+    )
+    payment_columns = [column for column in PAYMENT_TYPES if column in payment_mix.columns]
+    return (
+        results["totals"]
+        .join(top_brand, on="STORE_NAME", how="left")
+        .join(payment_mix, on="STORE_NAME", how="left")
+        .join(on_target, on="STORE_NAME", how="left")
+        .select(
+            "STORE_NAME", "Total_Sales", "Transaction_Count", "Weeks_On_Target",
+            "Top_Brand", "Top_Brand_Share", *payment_columns,
+        )
+        .sort("Total_Sales", descending=True)
+    )
+
+
+# Tab 4: Demographics (the tract dimension table, joined per store at load)
+
+LOCATION_COLUMNS = ["state_fips", "county_fips", "tract"]
+
+# ACS variables
+ACS_COLUMNS = [
+    "median_family_income",
+    "median_income_by_earners",
+    "number_of_earners",
+    "median_income_with_children",
+    "household_type_population",
+    "population",
+    "median_age",
+    "unemployed",
+    "housing_units",
+    "bachelors_degree_count"
+]
+
+def store_demographics(lf, tracts):
+    # One row per store and tract: a scan of two integer-coded columns
+    if tracts is None:
+        return lf.select("STORE_NAME").unique().sort("STORE_NAME")
+    return (
+        lf.select("STORE_NAME", "TRACT_KEY")
+        .unique()
+        .join(tracts, on="TRACT_KEY")
+        .drop("TRACT_KEY")
+        .sort("STORE_NAME")
+    )
+
+
+def combine_demographics(frames):
+    return pl.concat(frames, how="diagonal").unique().sort("STORE_NAME")
+
+
+def demographics_plan(demographics, store, location_columns, acs_columns):
+    rows = demographics.lazy().filter(pl.col("STORE_NAME") == store)
+    frames = {}
+    if location_columns:
+        frames["locations"] = rows.select(location_columns).unique()
+    if acs_columns:
+        frames["acs"] = rows.select(acs_columns).unique()
+
+    def finish(results):
+        return {"locations": results.get("locations"), "acs": results.get("acs")}
+
+    return frames, finish
+
+
+def demographics_tab(demographics, store, location_columns, acs_columns):
+    return collect_plan(demographics_plan(demographics, store, location_columns, acs_columns))
+
+
+# Every tab is a plan: a dict of lazy frames and a finish step that turns
+# their collected results into the tab's bundle. collect_plans runs the plans
+# of several tabs in one collect_all. Plans built from the same slice of the
+# cube share identical subplans, such as the valid-item filter that
+# weekly_products, top_products and top_items_by_payment all start from, and
+# Polars computes those once. The independent aggregations run concurrently.
+
+def collect_plans(plans):
+    keys = [(tab, name) for tab, (frames, _) in plans.items() for name in frames]
+    frames = pl.collect_all([plans[tab][0][name] for tab, name in keys])
+    collected = {tab: {} for tab in plans}
+    for (tab, name), frame in zip(keys, frames):
+        collected[tab][name] = frame
+    return {tab: finish(collected[tab]) for tab, (_, finish) in plans.items()}
+
+
+def collect_plan(plan):
+    return collect_plans({None: plan})[None]
+
+
+# Paged tables: search and sort run here and only the visible page of rows is
+# sent to the browser. Search matches any column's text, case-insensitively.
+
+def table_view(frame, search="", sort_by=None, descending=False):
+    if search:
+        needle = search.lower()
+        frame = frame.filter(pl.any_horizontal(
+            pl.col(column).cast(pl.String).str.to_lowercase().str.contains(needle, literal=True)
+            for column in frame.columns
+        ))
+    if sort_by:
+        frame = frame.sort(sort_by, descending=descending, nulls_last=True, maintain_order=True)
+    return frame
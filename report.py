@@ -0,0 +1,280 @@
+import argparse
+import html
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from multiprocessing import get_context
+
+import plotly.offline
+import polars as pl
+from great_tables import GT
+
+import charts
+import data
+import loader
+import queries
+
+
+# Static per-store reports built from the same queries and chart builders as
+# app.py. The parent loads the snapshot and derived tables once and writes
+# them as uncompressed Arrow IPC files; every worker memory-maps those, so the
+# workers share one copy in the page cache instead of each reading the CSV.
+
+TABLES = ["cube", "series", "topk", "topk_payment", "demographics"]
+PLOTLY_JS = "plotly.min.js"
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 1100px; }}
+.metrics {{ display: flex; gap: 3em; }}
+.metric .label {{ color: #666; font-size: 0.9em; }}
+.metric .value {{ font-size: 1.6em; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+_tables = None
+
+
+def _load_tables(tables_dir):
+    global _tables
+    # rechunk would copy the mapped buffers into every worker's heap
+    frames = {
+        name: pl.read_ipc(os.path.join(tables_dir, f"{name}.arrow"), memory_map=True, rechunk=False)
+        for name in TABLES
+    }
+    indexes = queries.index_tables(
+        frames["cube"], frames["series"], frames["topk"], frames["topk_payment"]
+    )
+    _tables = frames["cube"], indexes, frames["demographics"]
+
+
+def save_tables(tables_dir, cube, indexes, demographics):
+    frames = {
+        "cube": cube,
+        "series": indexes["series"],
+        "topk": indexes["topk"],
+        "topk_payment": indexes["topk_payment"],
+        "demographics": demographics,
+    }
+    for name, frame in frames.items():
+        frame.write_ipc(os.path.join(tables_dir, f"{name}.arrow"), compression="uncompressed")
+
+
+def windows(kind, periods, min_date, max_date):
+    # The latest `periods` complete calendar weeks or months in the data; a
+    # period cut short by either end of the data is left out
+    if kind == "all":
+        return [(min_date, max_date)]
+
+    def period_start(day):
+        return day - timedelta(days=day.weekday()) if kind == "week" else day.replace(day=1)
+
+    spans = []
+    end = period_start(max_date + timedelta(days=1)) - timedelta(days=1)
+    while len(spans) < periods:
+        start = period_start(end)
+        if start < min_date:
+            break
+        spans.append((start, end))
+        end = start - timedelta(days=1)
+    return spans[::-1]
+
+
+def report_name(store, start, end):
+    return f"{re.sub(r'[^A-Za-z0-9_-]+', '_', store)}_{start:%Y%m%d}_{end:%Y%m%d}"
+
+
+def _metrics(items):
+    cells = "".join(
+        f'<div class="metric"><div class="label">{html.escape(label)}</div>'
+        f'<div class="value">{html.escape(value)}</div></div>'
+        for label, value in items
+    )
+    return f'<div class="metrics">{cells}</div>'
+
+
+def _sections(store, start, end):
+    # (heading, [GT | Figure | html string]) in the order the app shows them
+    cube, indexes, demographics = _tables
+    lf = queries.slice_cube(cube, indexes["cube"], store, start, end)
+    sections = []
+
+    top = queries.top_products_tab(cube, indexes, store, start, end)["top_products"]
+    if top.height > 0:
+        sections.append(("Top 5 Products (Excluding Fuels)", [
+            _metrics([
+                ("Top Product Overall", str(top[0, "ITEM_NAME"])),
+                ("Quantity Sold", f"{top[0, 'Total_Sold']:,}"),
+            ]),
+            charts.top_products_table(top),
+            charts.top_products_bar(top),
+        ]))
+
+    beverages = queries.beverage_tab(lf)
+    totals = beverages["totals"]
+    if totals[0, "Unique_Brands"] > 0:
+        top_brands = beverages["brand_sales"].head(10)
+        sections.append(("Packaged Beverage Brands", [
+            _metrics([
+                ("Total Beverage Sales", f"${totals[0, 'Total_Sales']:,.2f}"),
+                ("Total Quantity", f"{totals[0, 'Total_Quantity']:,}"),
+                ("Unique Brands", f"{totals[0, 'Unique_Brands']}"),
+            ]),
+            charts.brand_table(top_brands, "Top 10 Beverage Brands by Quantity"),
+            charts.brand_bar(top_brands, "Total_Quantity", "Top 10 Beverage Brands by Quantity", "#ff7f0e"),
+        ]))
+
+    payments = queries.payment_tab(cube, indexes, store, start, end)
+    payment_summary = payments["payment_summary"]
+    if payment_summary.height > 0:
+        items = [
+            _metrics([(row["PAYMENT_TYPE"], f"${row['Total_Sales']:,.2f}")
+                      for row in payment_summary.iter_rows(named=True)]),
+            charts.payment_summary_table(payment_summary),
+        ]
+        if payments["weekly_payment"].height > 0:
+            target_line = payments["weekly_stats"]["mean"]
+            items.append(charts.weekly_payment_line(payments["weekly_payment"], target_line))
+        top_items = payments["top_items_by_payment"]
+        for payment_type in top_items.get_column("PAYMENT_TYPE").unique().sort().to_list():
+            payment_data = (
+                top_items
+                .filter(pl.col("PAYMENT_TYPE") == payment_type)
+                .sort("Total_Quantity", descending=False)
+            )
+            items.append(charts.payment_items_bar(payment_data, payment_type))
+        sections.append(("Cash vs Credit", items))
+
+    acs_columns = [column for column in queries.ACS_COLUMNS if column in demographics.columns]
+    if len(acs_columns) >= 10:
+        acs = queries.demographics_tab(demographics, store, [], acs_columns)["acs"]
+        sections.append(("Store Demographics", [charts.acs_table(acs)]))
+
+    return sections
+
+
+def render_report(store, start, end, out_dir, png=False):
+    started = time.perf_counter()
+    name = report_name(store, start, end)
+    body = []
+    figure_count = 0
+    for heading, items in _sections(store, start, end):
+        body.append(f"<h2>{html.escape(heading)}</h2>")
+        for item in items:
+            if isinstance(item, str):
+                body.append(item)
+            elif isinstance(item, GT):
+                body.append(item.as_raw_html())
+            else:
+                body.append(item.to_html(full_html=False, include_plotlyjs=False))
+                if png:
+                    item.write_image(os.path.join(out_dir, f"{name}-{figure_count:02d}.png"))
+                figure_count += 1
+    title = f"{store}: {start:%Y-%m-%d} to {end:%Y-%m-%d}"
+    path = os.path.join(out_dir, f"{name}.html")
+    with open(path, "w") as f:
+        f.write(PAGE.format(title=html.escape(title), plotly_js=PLOTLY_JS, body="\n".join(body)))
+    return store, start, end, path, time.perf_counter() - started
+
+
+def write_index(out_dir, reports):
+    rows = "\n".join(
+        f'<li><a href="{html.escape(os.path.basename(path))}">'
+        f'{html.escape(store)}: {start:%Y-%m-%d} to {end:%Y-%m-%d}</a></li>'
+        for store, start, end, path, _ in sorted(reports, key=lambda r: (r[1], r[0]))
+    )
+    with open(os.path.join(out_dir, "index.html"), "w") as f:
+        f.write(PAGE.format(title="Cstore Reports", plotly_js=PLOTLY_JS, body=f"<ul>\n{rows}\n</ul>"))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render static per-store HTML reports for the latest weeks or months."
+    )
+    parser.add_argument("--data-url", default=data.DATA_URL,
+                        help="gs:// URL or local path of the transactions CSV or a directory of CSVs")
+    parser.add_argument("--snapshot-dir", default=data.SNAPSHOT_DIR)
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--window", choices=["week", "month", "all"], default="week")
+    parser.add_argument("--periods", type=int, default=1,
+                        help="number of most recent complete windows to report on")
+    parser.add_argument("--stores", help="comma separated store names (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--png", action="store_true",
+                        help="also export every chart as PNG (needs kaleido)")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.png:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            parser.error("--png needs the kaleido package")
+
+    started = time.perf_counter()
+    cube, indexes, demographics, store_options, (min_date, max_date), spans = loader.load(
+        args.data_url, args.snapshot_dir
+    )
+    stores = args.stores.split(",") if args.stores else store_options
+    unknown = sorted(set(stores) - set(store_options))
+    if unknown:
+        parser.error(f"unknown stores: {', '.join(unknown)}")
+    periods = windows(args.window, args.periods, min_date, max_date)
+    if not periods:
+        parser.error(f"no complete {args.window} between {min_date} and {max_date}")
+    jobs = [(store, start, end) for start, end in periods for store in stores]
+    print(f"Loaded {len(spans)} partitions in {time.perf_counter() - started:.1f}s; "
+          f"rendering {len(jobs)} reports", file=sys.stderr)
+
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, PLOTLY_JS), "w") as f:
+        f.write(plotly.offline.get_plotlyjs())
+
+    tables_dir = tempfile.mkdtemp(prefix="cstore-report-")
+    reports = []
+    try:
+        save_tables(tables_dir, cube, indexes, demographics)
+        # Split the cores between workers instead of every worker's Polars
+        # pool claiming all of them; spawned workers inherit the variable
+        os.environ.setdefault(
+            "POLARS_MAX_THREADS", str(max(1, (os.cpu_count() or 1) // args.workers))
+        )
+        # spawn, not fork: Polars' thread pool does not survive a fork
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=get_context("spawn"),
+            initializer=_load_tables,
+            initargs=(tables_dir,),
+        ) as pool:
+            futures = [pool.submit(render_report, *job, args.out, args.png) for job in jobs]
+            for future in as_completed(futures):
+                report = future.result()
+                reports.append(report)
+                print(f"[{len(reports)}/{len(jobs)}] {report[3]} ({report[4]:.2f}s)", file=sys.stderr)
+    finally:
+        shutil.rmtree(tables_dir, ignore_errors=True)
+
+    write_index(args.out, reports)
+    print(f"Wrote {len(reports)} reports to {args.out} in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+import sys
+import threading
+
+import loader
+
+
+PORT = os.environ.get("PORT", "8080")
+# Cloud Run only routes requests once the port accepts connections, so holding
+# the bind until the warm-up has finished is the readiness signal. Set to 0 to
+# serve straight away and let the first session wait on the load instead.
+WAIT_FOR_WARM = os.environ.get("CSTORE_WAIT_FOR_WARM", "1") != "0"
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def main():
+    warmer = threading.Thread(target=loader.warm, name="warm", daemon=True)
+    warmer.start()
+    # Streamlit's own import overlaps with the snapshot load
+    from streamlit.web import cli
+
+    if WAIT_FOR_WARM:
+        warmer.join()
+    cli.main(
+        args=["run", APP, f"--server.port={PORT}", "--server.address=0.0.0.0", *sys.argv[1:]],
+        prog_name="streamlit",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Structured timing lines go to stdout, where Cloud Run picks up JSON payloads
+TIMING_LOG = os.environ.get("CSTORE_TIMING_LOG", "1") != "0"
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Stages in flight across all sessions, and stages started so far; the peak
+# is process-wide, so it is only reset and reported for a stage that ran alone
+_stages_lock = threading.Lock()
+_stages_running = 0
+_stages_started = 0
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux only)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    # VmHWM is the peak since the last reset_peak_rss(); without /proc this
+    # falls back to ru_maxrss, the process-lifetime peak in KiB
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def log(message, **fields):
+    if not TIMING_LOG:
+        return
+    entry = {"severity": "INFO", "message": message, **fields}
+    sys.stdout.write(json.dumps(entry, default=str) + "\n")
+    sys.stdout.flush()
+
+
+class Timings:
+    # Collects the stages of one script run; every stage is also logged
+
+    def __init__(self, **context):
+        self.context = context
+        self.records = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, stage, **fields):
+        global _stages_running, _stages_started
+        record = {"stage": stage, **fields}
+        with _stages_lock:
+            _stages_running += 1
+            _stages_started += 1
+            started_as = _stages_started
+            # Resetting under another stage would cut that stage's peak short
+            peak_reset = _stages_running == 1 and reset_peak_rss()
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["ms"] = round((time.perf_counter() - started) * 1000, 2)
+            rss_after = rss_mb()
+            if rss_before is not None and rss_after is not None:
+                record["rss_mb"] = round(rss_after, 1)
+                record["rss_delta_mb"] = round(rss_after - rss_before, 1)
+            with _stages_lock:
+                _stages_running -= 1
+                # Any stage started since shares the high-water mark
+                if peak_reset and _stages_started == started_as:
+                    record["peak_rss_mb"] = round(peak_rss_mb(), 1)
+            self.records.append(record)
+            log(f"stage {stage}", **self.context, **record)
+
+    def total_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 2)
+
+    def summary(self):
+        log(
+            "rerun",
+            **self.context,
+            stage="rerun",
+            ms=self.total_ms(),
+            stages=len(self.records),
+            cache_hits=sum(1 for r in self.records if r.get("cache") == "hit"),
+            cache_misses=sum(1 for r in self.records if r.get("cache") == "miss"),
+        )
@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+import queries
+
+
+# A refresh splices the touched days into the previous tables; every table
+# must come out as a full rebuild over the new partitions would
+
+FIRST_DAY = date(2024, 1, 3)
+DAYS = 90
+
+
+def _partition(seed, first, days, rows=8_000):
+    rng = np.random.default_rng(seed)
+    start = datetime.combine(first, datetime.min.time())
+    # Fewer items than TOPK_DEPTH, so ties at the depth cannot pick
+    # different items in the two builds
+    item = rng.integers(0, 40, rows)
+    transactions = pl.DataFrame({
+        "STORE_NAME": rng.choice(["Store A", "Store B", "Store C"], rows),
+        "TRANSACTION_DATE": pl.Series(
+            [start + timedelta(seconds=int(s)) for s in rng.integers(0, days * 86_400, rows)]
+        ),
+        "ITEM_NAME": [f"Item {i:02d}" for i in item],
+        "BRAND": [f"Brand {i % 20:02d}" for i in item],
+        "CATEGORY": np.array(["Fuel", "Candy", "Salty Snacks"])[item % 3],
+        "PAYMENT_TYPE": rng.choice(queries.PAYMENT_TYPES + ["FLEET"], rows),
+        "QUANTITY": rng.integers(1, 4, rows),
+        "TOTAL_SALE": rng.random(rows) * 10,
+    })
+    return queries.build_cube(transactions.lazy()).collect()
+
+
+def _span(cube):
+    return cube.get_column("DATE").min(), cube.get_column("DATE").max()
+
+
+@pytest.fixture(scope="module")
+def partitions():
+    # Thirty-day partitions plus one that overlaps two of them
+    parts = {
+        f"part-{n}": _partition(n, FIRST_DAY + timedelta(days=30 * n), 30)
+        for n in range(DAYS // 30)
+    }
+    parts["late"] = _partition(99, FIRST_DAY + timedelta(days=25), 10, rows=500)
+    return parts
+
+
+def _refresh(before, after):
+    cube = queries.combine_cubes(list(before.values()))
+    indexes = queries.build_indexes(cube)
+    touched = [_span(before[name]) for name in before if name not in after or after[name] is not before[name]]
+    touched += [_span(after[name]) for name in after if after[name] is not before.get(name)]
+    first = min(span[0] for span in touched)
+    last = max(span[1] for span in touched)
+    fresh = queries.combine_cubes([
+        part.filter(pl.col("DATE").is_between(first, last)) for part in after.values()
+    ])
+    return queries.update_tables(cube, indexes, fresh, first, last)
+
+
+def _assert_same(cube, indexes, parts):
+    expected_cube = queries.combine_cubes(list(parts.values()))
+    expected = queries.build_indexes(expected_cube)
+    assert_frame_equal(cube.sort(pl.all()), expected_cube.sort(pl.all()))
+    # Running sums may differ in the last bits where they were summed in
+    # another order, and the weekly lists are not ordered within a week
+    for name, column in [("series", "DATE"), ("topk", "WEEK"), ("topk_payment", "WEEK")]:
+        index = indexes[f"{name}_index"]
+        assert index.keys() == expected[f"{name}_index"].keys()
+        for key, block in index.items():
+            assert indexes[name].get_column(column).slice(*block).is_sorted()
+            assert_frame_equal(
+                indexes[name].slice(*block).sort(pl.all()),
+                expected[name].slice(*expected[f"{name}_index"][key]).sort(pl.all()),
+            )
+    for store, (offset, length) in indexes["cube"].items():
+        dates = cube.get_column("DATE").slice(offset, length)
+        assert dates.is_sorted() and (cube.get_column("STORE_NAME").slice(offset, length) == store).all()
+
+
+def test_new_partition(partitions):
+    before = {name: part for name, part in partitions.items() if name != "part-2"}
+    _assert_same(*_refresh(before, partitions), partitions)
+
+
+def test_changed_partition(partitions):
+    after = dict(partitions, late=_partition(100, FIRST_DAY + timedelta(days=27), 12, rows=700))
+    _assert_same(*_refresh(partitions, after), after)
+
+
+def test_removed_partition(partitions):
+    after = {name: part for name, part in partitions.items() if name != "part-1"}
+    _assert_same(*_refresh(partitions, after), after)
@@ -0,0 +1,109 @@
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+import data
+import queries
+
+
+# The top-K plans merge weekly lists with exact edge days; with the row
+# threshold at 0 they always take that path and must match the exact queries
+
+FIRST_DAY = date(2024, 1, 3)
+DAYS = 120
+
+
+# Shallow lists over a flat popularity curve leave many items off each week's
+# list, so the residual bounds decide most ranges; the default depth covers
+# the common case. Snapshots store the text columns as Enums, which the plans
+# filter differently from String columns, so both are built.
+@pytest.fixture(
+    scope="module",
+    params=[(depth, enums) for depth in [3, queries.TOPK_DEPTH] for enums in [False, True]],
+    ids=lambda param: f"depth{param[0]}-{'enum' if param[1] else 'string'}",
+)
+def tables(request):
+    depth, enums = request.param
+    rng = np.random.default_rng(7)
+    rows = 60_000
+    items = 120
+    popularity = 1.0 / np.arange(1, items + 1) ** 0.6
+    popularity /= popularity.sum()
+    item = rng.choice(items, rows, p=popularity)
+    categories = np.array(["Fuel", "Packaged Beverages", "Candy", "Salty Snacks"])
+    start = datetime.combine(FIRST_DAY, datetime.min.time())
+    transactions = pl.DataFrame({
+        "STORE_NAME": rng.choice(["Store A", "Store B"], rows),
+        "TRANSACTION_DATE": pl.Series(
+            [start + timedelta(seconds=int(s)) for s in rng.integers(0, DAYS * 86_400, rows)]
+        ),
+        "ITEM_NAME": [f"Item {i:03d}" for i in item],
+        "BRAND": [f"Brand {i % 40:02d}" for i in item],
+        "CATEGORY": categories[item % len(categories)],
+        "PAYMENT_TYPE": rng.choice(queries.PAYMENT_TYPES + ["FLEET"], rows),
+        "QUANTITY": rng.integers(1, 4, rows),
+        "TOTAL_SALE": rng.random(rows) * 10,
+    })
+    if enums:
+        transactions = data.encode_enums(transactions, {
+            column: transactions.get_column(column).unique().to_list()
+            for column in data.ENUM_COLUMNS
+        })
+    cube = queries.build_cube(transactions.lazy()).collect()
+    indexes = queries.index_tables(
+        cube,
+        queries.build_payment_series(cube.lazy()).collect(),
+        queries.build_topk(cube.lazy(), depth=depth).collect(),
+        queries.build_topk(cube.lazy(), queries.TOPK_PAYMENT_KEYS, depth).collect(),
+    )
+    return cube, indexes
+
+
+def _ranges():
+    last_day = FIRST_DAY + timedelta(days=DAYS - 1)
+    rng = random.Random(11)
+    ranges = []
+    for _ in range(25):
+        start = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+        ranges.append((start, min(last_day, start + timedelta(days=rng.randrange(90)))))
+    monday = FIRST_DAY + timedelta(days=-FIRST_DAY.weekday() % 7)
+    ranges += [
+        (FIRST_DAY, last_day),
+        (monday + timedelta(days=14), monday + timedelta(days=14)),
+        (monday + timedelta(days=22), monday + timedelta(days=22)),
+        (monday + timedelta(days=29), monday + timedelta(days=32)),
+        (monday + timedelta(days=35), monday + timedelta(days=41)),
+        (monday + timedelta(days=7), monday + timedelta(days=52)),
+        (monday + timedelta(days=10), monday + timedelta(days=48)),
+        (monday + timedelta(days=10), monday + timedelta(days=55)),
+    ]
+    return ranges
+
+
+@pytest.fixture(autouse=True)
+def always_ranked(monkeypatch):
+    monkeypatch.setattr(queries, "TOPK_MIN_ROWS", 0)
+
+
+@pytest.mark.parametrize("store", ["Store A", "Store B"])
+@pytest.mark.parametrize("start, end", _ranges())
+def test_top_products_matches_exact(tables, store, start, end):
+    cube, indexes = tables
+    lf = queries.slice_cube(cube, indexes["cube"], store, start, end)
+    ranked = queries.collect_plan(queries.top_products_plan(lf, cube, indexes, store, start, end))
+    exact = queries.top_products(lf).collect()
+    # Items tied at the cutoff may differ; the quantities may not
+    assert ranked["top_products"].get_column("Total_Sold").to_list() == exact.get_column("Total_Sold").to_list()
+
+
+@pytest.mark.parametrize("store", ["Store A", "Store B"])
+@pytest.mark.parametrize("start, end", _ranges())
+def test_top_items_by_payment_matches_exact(tables, store, start, end):
+    cube, indexes = tables
+    lf = queries.slice_cube(cube, indexes["cube"], store, start, end)
+    ranked = queries.collect_plan(queries.payment_plan(lf, cube, indexes, store, start, end))
+    exact = queries.top_items_by_payment(lf).with_columns(pl.col("PAYMENT_TYPE").cast(pl.String)).collect()
+    assert ranked["top_items_by_payment"].sort(pl.all()).equals(exact.sort(pl.all()))